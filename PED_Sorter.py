@@ -2,27 +2,265 @@ import re
 import sys
 import json
 import os
-import gc
 from pathlib import Path
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+import queue
+import atexit
 from datetime import datetime
 import shutil
+import subprocess
+import hashlib
+import itertools
+import multiprocessing
+from collections import defaultdict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 
-import pytesseract
-from pdf2image import convert_from_path
-from PIL import Image
-import tempfile
-import pandas as pd
 from PySide6 import QtWidgets, QtGui, QtCore
+# Tesseract в каждом процессе распознавания работает в один поток - параллельность
+# обеспечивается количеством процессов. OpenMP читает ограничение при загрузке
+# библиотеки, поэтому оно задается до импорта tesserocr (процессы пула импортируют
+# этот модуль заново и тоже проходят эту строку)
+os.environ['OMP_THREAD_LIMIT'] = '1'
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    from python_calamine import CalamineWorkbook, SheetVisibleEnum
+except ImportError:
+    CalamineWorkbook = None
 
 from PED_design import Ui_MainWindow
 from tags_window_design import Ui_TagsWindow
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 tesseract_path = os.path.join(current_dir, 'Tesseract-OCR', 'tesseract.exe')
+tessdata_path = os.path.join(current_dir, 'Tesseract-OCR', 'tessdata')
+searchable_extensions = frozenset(('.pdf', '.xls', '.xlsx'))
 manual_path = os.path.join(current_dir, 'MANUAL-PED_SORTER.docx')
 poppler_path = os.path.join(current_dir, 'poppler', 'poppler-25.07.0', 'Library', 'bin')
+# сначала пробуем взять текст первой страницы из текстового слоя PDF, распознавание - только
+# если его нет (сканы). Меньше min_text_layer_length символов текстом не считаем
+try_text_layer_first = True
+min_text_layer_length = 50
+# из excel сначала читаем только шапку листа, весь лист - если в шапке тэгов не нашлось
+excel_header_rows = 50
+
+
+_tess_apis = {}
+
+
+def _get_tess_api(lang):
+    """Возвращает экземпляр Tesseract API текущего процесса: модели языка
+    загружаются один раз, а не при распознавании каждого файла"""
+    if lang not in _tess_apis:
+        if not _tess_apis:
+            atexit.register(_end_tess_apis)
+        _tess_apis[lang] = tesserocr.PyTessBaseAPI(
+            path=tessdata_path,
+            lang=lang,
+            oem=tesserocr.OEM.LSTM_ONLY,
+            psm=tesserocr.PSM.SINGLE_BLOCK
+        )
+    return _tess_apis[lang]
+
+
+def _end_tess_apis():
+    """Освобождает модели Tesseract процесса при его завершении"""
+    for api in _tess_apis.values():
+        api.End()
+    _tess_apis.clear()
+
+
+def read_pdf_text_layer(pdf_path, poppler_path):
+    """Извлекает текстовый слой первой страницы PDF через pdftotext. Возвращает None,
+    если текстового слоя нет или pdftotext не отработал"""
+    pdftotext = os.path.join(poppler_path, 'pdftotext.exe' if sys.platform == 'win32' else 'pdftotext')
+    try:
+        result = subprocess.run(
+            [pdftotext, '-f', '1', '-l', '1', '-layout', '-enc', 'UTF-8', str(pdf_path), '-'],
+            capture_output=True,
+            timeout=10,
+            creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0)  # без мигающих окон консоли
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+    text = result.stdout.decode('utf-8', 'ignore')
+    if len(text.strip()) <= min_text_layer_length:
+        return None
+    return text
+
+
+def ocr_first_page(pdf_path, lang, poppler_path, tesseract_path):
+    """Извлекает текст с первой страницы PDF используя OCR.
+    Функция уровня модуля, чтобы ее можно было выполнять в отдельных процессах"""
+    # PDF, созданный программой, а не сканер, уже содержит текст - распознавать его
+    # не нужно, pdftotext достает текст на порядки быстрее Tesseract
+    if try_text_layer_first:
+        text = read_pdf_text_layer(pdf_path, poppler_path)
+        if text is not None:
+            return text.lower()
+    # Конвертируем первую страницу PDF в изображение. Одна страница в 200 dpi в оттенках
+    # серого занимает несколько мегабайт, поэтому poppler передает ее через pipe прямо в
+    # память, без временных файлов на диске. Формат ppm без сжатия: не тратим время на
+    # кодирование/декодирование jpeg и не теряем тонкие буквы
+    from pdf2image import convert_from_path
+    images = convert_from_path(
+        pdf_path,
+        first_page=1,
+        last_page=1,
+        dpi=200,
+        grayscale=True,
+        fmt='ppm',
+        poppler_path=poppler_path
+    )
+    if not images:
+        return ''
+    image = images[0]
+    try:
+        # Распознаем текст с изображения быстрым LSTM движком. Если установлен
+        # tesserocr - через API в этом же процессе, иначе запуском tesseract.exe
+        if tesserocr is not None:
+            api = _get_tess_api(lang)
+            api.SetImage(image)
+            text = api.GetUTF8Text()
+        else:
+            import pytesseract
+            pytesseract.pytesseract.tesseract_cmd = tesseract_path
+            text = pytesseract.image_to_string(image, lang=lang, config='--oem 1 --psm 6')
+    finally:
+        image.close()
+    return text.lower()
+
+
+def read_excel_first_rows(filepath, max_rows=excel_header_rows):
+    """Читает первые max_rows строк первого видимого листа excel файла, при max_rows=None -
+    весь лист (нужен, только если в шапке тэгов не нашлось).
+    Функция уровня модуля, чтобы ее можно было выполнять в отдельных процессах"""
+    # calamine разбирает и xls, и xlsx в нативном коде, openpyxl и xlrd - если его нет
+    if CalamineWorkbook is not None and str(filepath).lower().endswith(('.xls', '.xlsx')):
+        return _read_calamine_visible_sheet(filepath, max_rows)
+    if str(filepath).lower().endswith('.xlsx'):
+        return _read_xlsx_visible_sheet(filepath, max_rows)
+    elif str(filepath).lower().endswith('.xls'):
+        return _read_xls_visible_sheet(filepath, max_rows)
+    return None
+
+
+def _is_service_sheet(sheet_name):
+    """Служебный лист xls, определяется по имени (xlrd не сообщает, скрыт ли лист)"""
+    sheet_lower = sheet_name.lower()
+    system_keywords = ['_', 'sheet', 'hidden', 'veryhidden', 'sys', 'temp']
+    if any(keyword in sheet_lower for keyword in system_keywords):
+        return True
+    return sheet_lower.startswith(('~', '$')) or len(sheet_name.strip()) == 0
+
+
+def _read_calamine_sheet(workbook, sheet_name, max_rows):
+    """Первые max_rows строк листа (все строки при None). Целые числа calamine отдает как float -
+    приводим их к int, как это делают openpyxl и xlrd, чтобы номера не получали '.0'"""
+    rows = workbook.get_sheet_by_name(sheet_name).to_python(skip_empty_area=False, nrows=max_rows)
+    return [
+        [int(value) if isinstance(value, float) and value.is_integer() else value for value in row]
+        for row in rows
+    ]
+
+
+def _read_calamine_visible_sheet(filepath, max_rows):
+    """Чтение первых строк первого видимого листа для xls и xlsx через python-calamine.
+    Лист выбирается по тем же правилам, что и при чтении через openpyxl и xlrd"""
+    import pandas as pd
+    workbook = CalamineWorkbook.from_path(str(filepath))
+    visible_sheets = [
+        sheet.name for sheet in workbook.sheets_metadata if sheet.visible == SheetVisibleEnum.Visible
+    ]
+    if str(filepath).lower().endswith('.xls'):
+        for sheet_name in visible_sheets:
+            if _is_service_sheet(sheet_name):
+                continue
+            rows = _read_calamine_sheet(workbook, sheet_name, max_rows)
+            if any(value != '' for row in rows for value in row):
+                return pd.DataFrame(rows)
+    elif visible_sheets:
+        return pd.DataFrame(_read_calamine_sheet(workbook, visible_sheets[0], max_rows))
+    for sheet_name in workbook.sheet_names:
+        if not sheet_name.startswith('_'):
+            return pd.DataFrame(_read_calamine_sheet(workbook, sheet_name, max_rows))
+    logging.getLogger('PEDSorter').warning(f'Не найдено видимых листов в {filepath}')
+    return None
+
+
+def _read_xlsx_visible_sheet(filepath, max_rows):
+    """Чтение первых строк первого видимого листа для xlsx"""
+    import pandas as pd
+    try:
+        from openpyxl import load_workbook
+        wb = load_workbook(filepath, read_only=True, data_only=True)
+        try:
+            visible_sheet_name = None
+            for sheet_name in wb.sheetnames:
+                sheet = wb[sheet_name]
+                if sheet.sheet_state == 'visible':
+                    visible_sheet_name = sheet_name
+                    break
+            if visible_sheet_name is None:
+                for sheet_name in wb.sheetnames:
+                    if not sheet_name.startswith('_'):
+                        visible_sheet_name = sheet_name
+                        break
+            if visible_sheet_name is None:
+                logging.getLogger('PEDSorter').warning(f'Не найдено видимых листов в {filepath}')
+                return None
+            # потоковое чтение: разбирается только начало xml листа
+            sheet = wb[visible_sheet_name]
+            sheet.reset_dimensions()
+            rows = list(itertools.islice(sheet.iter_rows(values_only=True), max_rows))
+            return pd.DataFrame(rows)
+        finally:
+            wb.close()
+    except ImportError:
+        return _read_fallback(filepath, 'openpyxl', max_rows)
+
+
+def _read_xls_visible_sheet(filepath, max_rows):
+    """Чтение первых строк первого видимого листа для xls. Ошибку чтения файла не
+    перехватывает - ее записывает в лог вызывающий код"""
+    import pandas as pd
+    with pd.ExcelFile(filepath, engine='xlrd') as excel_file:
+        for sheet_name in excel_file.sheet_names:
+            if _is_service_sheet(sheet_name):
+                continue
+            try:
+                sheet_data = pd.read_excel(excel_file, sheet_name=sheet_name, header=None, nrows=max_rows)
+                if not sheet_data.empty:
+                    return sheet_data
+            except:
+                continue
+        for sheet_name in excel_file.sheet_names:
+            if not sheet_name.startswith('_'):
+                return pd.read_excel(excel_file, sheet_name=sheet_name, header=None, nrows=max_rows)
+        return None
+
+
+def _read_fallback(filepath, engine, max_rows):
+    """Резервный метод чтения"""
+    import pandas as pd
+    try:
+        with pd.ExcelFile(filepath, engine=engine) as excel_file:
+            for sheet_name in excel_file.sheet_names:
+                if not sheet_name.startswith('_'):
+                    return pd.read_excel(excel_file, sheet_name=sheet_name, header=None, nrows=max_rows)
+            return None
+    except:
+        return None
 
 
 class TagsManager:
@@ -31,6 +269,17 @@ class TagsManager:
         self.exec_dir = Path(__file__).parent.absolute()
         self.tags_file = self.exec_dir / 'file_types_base.json'
         self.tags_data = self._load_tags()
+        # правки тэгов идут сериями - файл перезаписывается один раз, через
+        # SAVE_DELAY_MS после последней правки, и при закрытии окна
+        self.SAVE_DELAY_MS = 500
+        self._dirty = False
+        self._save_timer = QtCore.QTimer()
+        self._save_timer.setSingleShot(True)
+        self._save_timer.setInterval(self.SAVE_DELAY_MS)
+        self._save_timer.timeout.connect(self.flush)
+        self.patterns = {}
+        for type_id in self.tags_data:
+            self._update_patterns(type_id)
 
     def _load_tags(self):
         """Загружает теги из файла или создает новый с дефолтными значениями"""
@@ -48,6 +297,8 @@ class TagsManager:
                 self._save_tags(default_tags)
                 return default_tags
             
+            if orjson is not None:
+                return orjson.loads(self.tags_file.read_bytes())
             with open(self.tags_file, 'r', encoding='utf-8') as f:
                 return json.load(f)
         except Exception as e:
@@ -55,14 +306,72 @@ class TagsManager:
             return default_tags
 
     def _save_tags(self, data):
-        """Сохраняет теги в файл"""
+        """Сохраняет теги в файл. Пишем всегда через json: файл тэгов правят руками,
+        формат не должен зависеть от того, установлен ли orjson"""
         with open(self.tags_file, 'w', encoding='utf-8') as f:
             json.dump(data, f, ensure_ascii=False, indent=4)
 
+    def _schedule_save(self):
+        """Откладывает сохранение тэгов до конца серии правок"""
+        self._dirty = True
+        self._save_timer.start()
+
+    def flush(self):
+        """Сохраняет тэги в файл, если они менялись с прошлого сохранения"""
+        self._save_timer.stop()
+        if self._dirty:
+            self._save_tags(self.tags_data)
+            self._dirty = False
+
+    def _merge_regexes(self, regexes):
+        """Объединяет выражения в одно - один поиск вместо поиска по каждому тэгу.
+        Тэги со ссылками на группы (\\1, (?P=...)) после объединения поменяли бы смысл,
+        а тэги, которые не собираются вместе (например, с флагами (?i) в начале),
+        не компилируются - в этих случаях оставляем отдельные выражения"""
+        if len(regexes) > 1 and not any(
+                re.search(r'\\\d|\(\?P=', pattern.pattern) for pattern in regexes):
+            try:
+                return [re.compile(
+                    '|'.join(f'(?:{pattern.pattern})' for pattern in regexes), re.IGNORECASE)]
+            except re.error:
+                pass
+        return regexes
+
+    def _update_patterns(self, type_id):
+        """Подготавливает тэги типа к поиску: тэги внутри файла компилируются в
+        регулярные выражения (по возможности - в одно), тэги имени делятся на слова
+        (множество в нижнем регистре) и регулярные выражения"""
+        name_words = set()
+        name_regexes = []
+        for tag in self.tags_data[type_id]['name_tags']:
+            if any(char in tag for char in '.*+?^$[]{}()|\\'):
+                try:
+                    name_regexes.append(re.compile(tag, re.IGNORECASE))
+                except re.error:
+                    continue
+            else:
+                name_words.add(tag.lower())
+        internal_regexes = []
+        for tag in self.tags_data[type_id]['internal_tags']:
+            try:
+                internal_regexes.append(re.compile(tag, re.IGNORECASE))
+            except re.error:
+                # некорректное выражение ищем как обычный текст
+                internal_regexes.append(re.compile(re.escape(tag.lower()), re.IGNORECASE))
+        self.patterns[type_id] = {
+            'name_words': frozenset(name_words),
+            'name_regexes': self._merge_regexes(name_regexes),
+            'internal_tags': self._merge_regexes(internal_regexes),
+        }
+
     def get_type_data(self, type_id):
         """Возвращает данные по типу файла"""
         return self.tags_data.get(str(type_id))
 
+    def get_internal_patterns(self, type_id):
+        """Возвращает скомпилированные выражения тэгов поиска внутри файла (пустой список - тэгов нет)"""
+        return self.patterns[str(type_id)]['internal_tags']
+
     def add_tag(self, type_id, new_tag, tag_area):
         """Добавляет новый тег для типа"""
         type_id = str(type_id)
@@ -70,7 +379,8 @@ class TagsManager:
             return False
         if new_tag not in self.tags_data[type_id][tag_area]:
             self.tags_data[type_id][tag_area].append(new_tag)
-            self._save_tags(self.tags_data)
+            self._update_patterns(type_id)
+            self._schedule_save()
             return True
         return False
 
@@ -79,7 +389,8 @@ class TagsManager:
         type_id = str(type_id)
         if type_id in self.tags_data and tag_to_remove in self.tags_data[type_id][tag_area]:
             self.tags_data[type_id][tag_area].remove(tag_to_remove)
-            self._save_tags(self.tags_data)
+            self._update_patterns(type_id)
+            self._schedule_save()
             return True
         return False
 
@@ -89,10 +400,91 @@ class TagsManager:
         if type_id not in self.tags_data:
             return False
         self.tags_data[type_id]['mask'] = new_mask
-        self._save_tags(self.tags_data)
+        self._schedule_save()
         return True
 
 
+class OCRCache:
+    """Класс для хранения распознанного текста PDF между запусками.
+    Запись ищется по содержимому файла, поэтому переименованный или скопированный
+    PDF повторно не распознается"""
+    def __init__(self):
+        self.exec_dir = Path(__file__).parent.absolute()
+        self.cache_file = self.exec_dir / 'ocr_cache.json'
+        self.MAX_ENTRIES = 20000  # давно не нужные записи вытесняются
+        self.HEAD_SIZE = 64 * 1024  # сколько первых байт файла входит в ключ
+        self.cache_data = self._load_cache()
+        self.is_changed = False
+
+    def _load_cache(self):
+        """Загружает кэш из файла. Записи лежат от давно использованных к недавним,
+        при превышении MAX_ENTRIES самые старые отбрасываются"""
+        try:
+            if not self.cache_file.exists():
+                return {}
+            if orjson is not None:
+                cache_data = orjson.loads(self.cache_file.read_bytes())
+            else:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    cache_data = json.load(f)
+        except Exception as e:
+            print(f'Ошибка загрузки кэша OCR: {e}')
+            return {}
+        # записи старого формата (по пути файла) не подходят под ключи по содержимому
+        entries = [(key, text) for key, text in cache_data.items() if isinstance(text, str)]
+        return dict(entries[-self.MAX_ENTRIES:])
+
+    def save(self):
+        """Сохраняет кэш в файл, если он изменился"""
+        if not self.is_changed:
+            return
+        try:
+            if orjson is not None:
+                self.cache_file.write_bytes(orjson.dumps(self.cache_data))
+            else:
+                with open(self.cache_file, 'w', encoding='utf-8') as f:
+                    json.dump(self.cache_data, f, ensure_ascii=False)
+        except OSError as e:
+            # папка программы может быть недоступна для записи - кэш тогда живет до закрытия
+            logging.getLogger('PEDSorter').error(f'Ошибка сохранения кэша OCR: {str(e)}')
+            return
+        self.is_changed = False
+
+    def file_key(self, filepath):
+        """Ключ записи: хэш первых HEAD_SIZE байт файла, размер и время изменения.
+        None, если файл не прочитать"""
+        try:
+            stat = os.stat(filepath)
+            with open(filepath, 'rb') as f:
+                head = f.read(self.HEAD_SIZE)
+        except OSError:
+            return None
+        digest = hashlib.blake2b(head, digest_size=16).hexdigest()
+        return f'{digest}-{stat.st_size}-{stat.st_mtime_ns}'
+
+    def get(self, key):
+        """Возвращает текст из кэша по ключу file_key или None, если файл не распознавался или изменился"""
+        if key is None:
+            return None
+        text = self.cache_data.pop(key, None)
+        if text is None:
+            return None
+        # переносим запись в конец - она использована недавно. Ради одного порядка записей
+        # файл не перезаписываем, порядок сохранится вместе со следующим изменением кэша
+        self.cache_data[key] = text
+        return text
+
+    def set(self, key, text):
+        """Запоминает распознанный текст файла по ключу file_key"""
+        if key is None:
+            return
+        self.cache_data.pop(key, None)
+        self.cache_data[key] = text
+        if len(self.cache_data) > self.MAX_ENTRIES:
+            del self.cache_data[next(iter(self.cache_data))]
+        self.is_changed = True
+
+
 class TagsWindow(QtWidgets.QMainWindow):
     """Класс отвечающий за окошко для редактирования тэгов"""
     def __init__(self, type_id, tags_manager, parent=None):
@@ -160,6 +552,176 @@ class TagsWindow(QtWidgets.QMainWindow):
                     self.ui.TagList_2.takeItem(self.ui.TagList_2.row(selected))
 
 
+class TraverseWorker(QtCore.QObject):
+    """Класс выполняющий обход директории в отдельном потоке, чтобы окно не зависало"""
+    progress = QtCore.Signal(int, str)
+    finished = QtCore.Signal(dict)
+
+    def __init__(self, scan_directory):
+        super().__init__()
+        self.scan_directory = scan_directory
+
+    @QtCore.Slot()
+    def run(self):
+        """Обходит директорию и передает результат в основной поток"""
+        try:
+            filenames = self.scan_directory(self.progress.emit)
+        except Exception as e:
+            logging.getLogger('PEDSorter').error(f'Ошибка обхода директории: {str(e)}')
+            filenames = {}
+        self.finished.emit(filenames)
+
+
+class FileJobsWorker(QtCore.QObject):
+    """Класс выполняющий переименование/копирование файлов в отдельном потоке, чтобы окно не зависало"""
+    progress = QtCore.Signal(int, str)
+    finished = QtCore.Signal(dict)
+
+    def __init__(self, process_jobs):
+        super().__init__()
+        self.process_jobs = process_jobs
+
+    @QtCore.Slot()
+    def run(self):
+        """Обрабатывает файлы и передает итог в основной поток"""
+        try:
+            outcome = self.process_jobs(self.progress.emit)
+        except Exception as e:
+            logging.getLogger('PEDSorter').error(f'Ошибка обработки файлов: {str(e)}')
+            outcome = {'done': [], 'errors': [('', '', str(e))]}
+        self.finished.emit(outcome)
+
+
+class FilenamesModel(QtCore.QAbstractTableModel):
+    """Модель таблицы найденных файлов. Данные хранятся списком строк, а не виджетом на каждую ячейку"""
+    new_name_edited = QtCore.Signal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.HEADERS = ('Имя (двойное нажатие - открыть)', 'Предполагаемый тип', 'Маска',
+                        'Новое имя', 'Переименовать?', 'Номер сметы')
+        self.KEYS = ('filename', 'type', 'mask', 'new_name', None, 'estimate_number')
+        self.STATUS_COLUMN = 4
+        self.NEW_NAME_COLUMN = 3
+        # кисти и шрифт создаются один раз, а не на каждую ячейку
+        self.BRUSHES = {
+            'unknown': QtGui.QBrush(QtGui.QColor(238, 186, 175)),  # красный - тип неизвестен
+            'incomplete': QtGui.QBrush(QtGui.QColor(238, 223, 175)),  # желтый - имя составлено не до конца
+            'done': QtGui.QBrush(QtGui.QColor(213, 238, 175)),  # зеленый - все сделал
+        }
+        # flags представление запрашивает для каждой ячейки при каждой перерисовке
+        self.FLAGS = {
+            'read_only': QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable,
+            'editable': QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable | QtCore.Qt.ItemIsEditable,
+            'checkbox': QtCore.Qt.ItemIsEnabled,  # отметку нельзя поставить
+            'checkable': QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsUserCheckable,
+        }
+        self.STATUS_ROLES = [QtCore.Qt.BackgroundRole, QtCore.Qt.CheckStateRole, QtCore.Qt.UserRole]
+        self.HEADER_BRUSH = QtGui.QBrush(QtGui.QColor(199, 199, 199))
+        self.HEADER_FONT = QtGui.QFont()
+        self.HEADER_FONT.setBold(True)
+        self._rows = []
+
+    def set_rows(self, filenames):
+        """Заменяет все строки модели найденными файлами"""
+        self.beginResetModel()
+        self._rows = []
+        for filename, data in filenames.items():
+            if data['type'] == '?':
+                status = 'unknown'
+            elif '?' in data['new_name']:
+                status = 'incomplete'
+            else:
+                status = 'done'
+            self._rows.append({
+                'filename': filename,
+                'type': data['type'],
+                'mask': data['mask'],
+                'new_name': data['new_name'] + data['extension'],
+                'estimate_number': data['estimate_number'],
+                'status': status,
+                'checked': status == 'done',
+                # ссылка на данные файла: они находятся без поиска по имени и после
+                # переименования файла, когда ключ в self.filenames уже другой
+                'info': data,
+            })
+        self.endResetModel()
+
+    def rows(self):
+        return self._rows
+
+    def set_status(self, row, status):
+        """Меняет статус строки: отметка и цвет всей строки"""
+        self._rows[row]['status'] = status
+        self._rows[row]['checked'] = status == 'done'
+        # один сигнал на строку, и только с ролями, которые зависят от статуса -
+        # представлению не нужно заново запрашивать текст ячеек
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.HEADERS) - 1), self.STATUS_ROLES)
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        column = index.column()
+        if role in (QtCore.Qt.DisplayRole, QtCore.Qt.EditRole):
+            key = self.KEYS[column]
+            return row[key] if key else None
+        if role == QtCore.Qt.BackgroundRole:
+            return self.BRUSHES.get(row['status'])
+        if column == self.STATUS_COLUMN:
+            if role == QtCore.Qt.CheckStateRole:
+                return QtCore.Qt.Checked if row['checked'] else QtCore.Qt.Unchecked
+            if role == QtCore.Qt.UserRole:
+                return row['status']
+        return None
+
+    def setData(self, index, value, role=QtCore.Qt.EditRole):
+        if not index.isValid():
+            return False
+        row = index.row()
+        column = index.column()
+        if column == self.NEW_NAME_COLUMN and role == QtCore.Qt.EditRole:
+            if self._rows[row]['new_name'] == value:
+                return False
+            self._rows[row]['new_name'] = value
+            self.dataChanged.emit(index, index)
+            self.new_name_edited.emit(row)
+            return True
+        if column == self.STATUS_COLUMN and role == QtCore.Qt.CheckStateRole:
+            self._rows[row]['checked'] = QtCore.Qt.CheckState(value) == QtCore.Qt.Checked
+            self.dataChanged.emit(index, index)
+            return True
+        return False
+
+    def flags(self, index):
+        column = index.column()
+        if column == self.NEW_NAME_COLUMN:
+            return self.FLAGS['editable']
+        if column == self.STATUS_COLUMN:
+            # отметить можно только строку с полностью составленным верным именем
+            if self._rows[index.row()]['status'] == 'done':
+                return self.FLAGS['checkable']
+            return self.FLAGS['checkbox']
+        return self.FLAGS['read_only']
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if orientation != QtCore.Qt.Horizontal:
+            return super().headerData(section, orientation, role)
+        if role == QtCore.Qt.DisplayRole:
+            return self.HEADERS[section]
+        if role == QtCore.Qt.FontRole:
+            return self.HEADER_FONT
+        if role == QtCore.Qt.BackgroundRole and section in (0, 1, 3):
+            return self.HEADER_BRUSH
+        return None
+
+
 class PEDSorterApp(QtWidgets.QMainWindow):
     """Класс отвечающий за работу основного окна"""
     def __init__(self):
@@ -173,8 +735,10 @@ class PEDSorterApp(QtWidgets.QMainWindow):
         self.filenames = dict()
         self.ui.FilesList.itemDoubleClicked.connect(self._on_file_double_clicked)
         self.ui.ChoosePEDButton.clicked.connect(self.choose_ped)
-        self.ui.Table.cellDoubleClicked.connect(self.open_file_in_explorer)
-        self.ui.Table.cellChanged.connect(self.on_cell_changed)
+        self.table_model = FilenamesModel(self.ui.Table)
+        self.ui.Table.setModel(self.table_model)
+        self.ui.Table.doubleClicked.connect(self.open_file_in_explorer)
+        self.table_model.new_name_edited.connect(self.on_new_name_edited)
         self.ui.SearchButton.clicked.connect(self.traverse_directory)
         self.ui.Rename_Button.clicked.connect(self.rename_files)
         self.ui.instruction_Button.clicked.connect(self.show_instruction)
@@ -186,10 +750,47 @@ class PEDSorterApp(QtWidgets.QMainWindow):
         self.ui.Rename_Button.setEnabled(False)
 
         self.directory = ''
+        self.traverse_thread = None
+        self.traverse_worker = None
+        self.file_jobs_thread = None
+        self.file_jobs_worker = None
+        self.file_jobs_cancelled = False
         self.tags_manager = TagsManager()
+        # окно тэгов может пережить главное окно - последние правки сохраняем и при выходе
+        QtWidgets.QApplication.instance().aboutToQuit.connect(self.tags_manager.flush)
+        self.ocr_cache = OCRCache()
+        self._row_new_names = []  # новое имя в каждой строке таблицы
+        self._rows_by_new_name = defaultdict(set)  # новое имя: строки таблицы с ним
+        self._name_validity = {}  # (строка, новое имя): результат is_name_valid
+        self._name_type_index = []  # (id типа, слова-тэги имени, регулярные тэги имени)
+        self._content_type_index = []  # (id типа, тип, маска, выражения тэгов внутри файла)
+        self._process_pool = None  # процессы чтения файлов живут, пока открыто окно
+        self._last_traversal = {}  # путь файла: (размер, время изменения, настройки поиска), данные для таблицы
         self._populate_files_list()
         self.DEFAULT_VERSION = 'БАЗ'
         self.DEFAULT_VERSION_NUMBER = ''
+        # версия одинакова во всех новых именах, а имена 4-6 типов отличаются только
+        # комментарием - составляем их один раз, а не для каждого файла
+        self.VERSION = f'{self.DEFAULT_VERSION}{self.DEFAULT_VERSION_NUMBER}'
+        self.NAMES_4_5_6 = {
+            '4': f'СРСД-{self.VERSION}',
+            '5': f'СРОВЗ-{self.VERSION}',
+            '6': f'ФОРМА1.3-{self.VERSION}',
+        }
+        # допустимые символы в имени файла и папки. str.translate с этой таблицей удаляет
+        # из имени допустимые символы, непустой остаток - значит имя недопустимо
+        valid_name_chars = (
+            'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+            'абвгдежзийклмнопрстуфхцчшщъыьэюяАБВГДЕЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯёЁ'
+            '0123456789_-.() '
+        )
+        self.VALID_NAME_CHARS = dict.fromkeys(map(ord, valid_name_chars))
+        # тип: [код в имени, номер по умолчанию, маска номера сметы]
+        self.TYPES_123_NAMING = {
+            '1': ['ЛС', '??-??-??', re.compile(r'^\d{1,2}-\d{1,2}(?:-\d{1,2})?$')],
+            '2': ['ОС', '??-??', re.compile(r'^\d{1,2}(?:-\d{1,2})?$')],
+            '3': ['ССР', '??', re.compile(r'^\d{1,2}$')],
+        }
         self.TYPES_7_AND_THEIR_CODENAMES = {
             '7.1': ['Расчеты на прочие затраты', '?', 1],
             '7.2': ['Перевозка', 'Перевозка', 1],
@@ -235,9 +836,16 @@ class PEDSorterApp(QtWidgets.QMainWindow):
             window.raise_()
         else:
             window = TagsWindow(type_id, self.tags_manager, self)
+            # поток обхода читает тэги - пока он идет, окно тэгов только для просмотра
+            window.setEnabled(self.traverse_thread is None)
             self.tags_windows[type_id] = window
             window.show()
 
+    def _set_tags_editing_enabled(self, enabled):
+        """Включает/выключает редактирование тэгов во всех открытых окнах тэгов"""
+        for window in self.tags_windows.values():
+            window.setEnabled(enabled)
+
     def _populate_files_list(self):
         """Заполняет FilesList всеми типами файлов из JSON"""
         self.ui.FilesList.clear()
@@ -269,22 +877,32 @@ class PEDSorterApp(QtWidgets.QMainWindow):
         directory = QtWidgets.QFileDialog.getExistingDirectory(self, 'Выберите папку ПСД')
         if directory:
             self.ui.DirectoryName.setText(directory)
-            self.ui.SearchButton.setEnabled(True)
-            self.directory = directory
+            # пока идет обход или обработка файлов, поиск остается выключенным
+            self.ui.SearchButton.setEnabled(self.traverse_thread is None and self.file_jobs_thread is None)
+            self.directory = os.path.normpath(directory)
         else:
             self.ui.SearchButton.setEnabled(False)
 
     def traverse_directory(self):
-        '''Обходит выбранную директорию; определяет типы файлов, вызывает функции для создания новых имен'''
-        QtWidgets.QApplication.setOverrideCursor(QtGui.QCursor(QtCore.Qt.BusyCursor))
+        '''Запускает обход выбранной директории в отдельном потоке'''
+        # окно во время обхода отвечает, курсор только показывает, что идет работа.
+        # Курсор ставится на главное окно, а не на все приложение - в окне тэгов он обычный
+        self.setCursor(QtGui.QCursor(QtCore.Qt.BusyCursor))
         self.logger.debug('=== НАЧАЛО traverse_directory ===')
-        files_count = 0
         self.table_is_full = False
         self.ui.Rename_Button.setEnabled(False)
-        percent_processed = 0
-        self.filenames = dict()
+        self.ui.SearchButton.setEnabled(False)
+        # папку нельзя сменить, пока поток обхода читает self.directory,
+        # а тэги - пока он читает tags_manager
+        self.ui.ChoosePEDButton.setEnabled(False)
+        self._set_tags_editing_enabled(False)
+        # состояние виджетов читаем здесь: в потоке обхода к ним обращаться нельзя
         self.ex_name_comment = self.ui.exname_checkBox.isChecked()
         self.ex_name_len = self.ui.exname_spinBox.value()
+        self.search_in_name = self.ui.search_in_name_checkBox.isChecked()
+        self.search_in_file = self.ui.search_in_file_checkBox.isChecked()
+        self.search_in_subfolders = self.ui.checkBox_subfolders.isChecked()
+        self.traverse_cancelled = False
 
         self.TYPES_7_AND_THEIR_CODENAMES = {
             '7.1': ['Перевозка', 'Перевозка', 1],
@@ -311,196 +929,414 @@ class PEDSorterApp(QtWidgets.QMainWindow):
             '8': ['Подтверждающие документы', '?', 1]
         }
 
-        if self.ui.checkBox_subfolders.isChecked():
-            walk_generator = os.walk(self.directory)
-        else:
-            files_in_dir = []
-            with os.scandir(self.directory) as entries:
-                for entry in entries:
-                    if entry.is_file():
-                        files_in_dir.append(entry.name)
-            walk_generator = [(self.directory, [], files_in_dir)]
-        
-        # обход дирректории
-        for root, _, files in walk_generator:
-            for filename in files:
-                if os.path.basename(filename).startswith('~$'):
-                    continue
-                filepath = Path(root) / filename
-                extension = filepath.suffix.lower()
-                type = self.UNKNOWN
-                new_name = self.UNKNOWN
-                mask = self.UNKNOWN
-                estimate_number = ''
-                excel_text_cache = None
-                pdf_text_cache = None
-
-                # Сначала поиск по имени файла
-                type_found_in_name = False
-                for type_id, type_data in self.tags_manager.tags_data.items():
-                    if '7.' in type_id:
-                        continue
-                    for tag_pattern in type_data['name_tags']:
-                        has_regex_specials = any(char in tag_pattern for char in '.*+?^$[]{}()|\\')
-                        if has_regex_specials:
-                            try:
-                                if re.search(tag_pattern, filename, re.IGNORECASE):
-                                    type = type_data['type']
-                                    mask = type_data['mask']
-                                    type_found_in_name = True
-                                    break
-                            except re.error:
-                                continue
-                        else:
-                            file_parts = re.split(r'[_\-. ]+', filename.lower())
-                            if tag_pattern.lower() in file_parts:
-                                type = type_data['type']
-                                mask = type_data['mask']
-                                type_found_in_name = True
-                                break
-                    if type_found_in_name:
-                        break
-                
-                # Если в имени не найдено, ищем внутри файла
-                if not type_found_in_name and self.ui.search_in_file_checkBox.isChecked():
-                    for type_id, type_data in self.tags_manager.tags_data.items():
-                        presence_tags = False
-                        # Для PDF
-                        if extension == '.pdf':
-                            name_without_ext = os.path.splitext(filename)[0]
-                            if not name_without_ext + '.xls' in files and not name_without_ext + '.xlsx' in files:
-                                if pdf_text_cache is None:
-                                    pdf_text_cache = self.extract_text_from_pdf_first_page(filepath)
-                                presence_tags = self.check_tags_in_pdf(pdf_text_cache, type_data["internal_tags"])
-                        # Для Excel
-                        elif extension in ['.xls', '.xlsx']:
-                            if excel_text_cache is None:
-                                excel_text_cache = self.read_xls_xlsx_file(filepath)
-                            presence_tags = self.check_tags_in_excel(excel_text_cache, type_data["internal_tags"])
-                        
-                        if presence_tags:
-                            type = type_data['type']
-                            mask = type_data['mask']
-                            break
-                if type == '?':
-                    type_id = 0
-                # вызов функции для создания имени в соответствии с типом файла:
-                if type_id in ['1', '2', '3']:
-                    if extension == '.pdf':
-                        name_without_ext = os.path.splitext(filename)[0]
-                        if not name_without_ext + '.xls' in files and not name_without_ext + '.xlsx' in files:
-                            new_name_result = self.create_name_for_123_local_object_summary_estimates(filepath, filename, pdf_text_cache, type_id)
-                    elif extension in ['.xls', '.xlsx']:
-                        new_name_result = self.create_name_for_123_local_object_summary_estimates(filepath, filename, excel_text_cache, type_id)
-                    if extension in ['.xls', '.xlsx', '.pdf']:
-                        new_name = new_name_result[0]
-                        estimate_number = new_name_result[1]
-
-                if type == 'Сводный реестр сметной документации':
-                    new_name = self.create_name_for_4_register_of_estimates(filepath, filename)
-                if type == 'Сметные расчеты на отдельные виды затрат':
-                    new_name = self.create_name_for_5_specific_types_of_costs(filepath, filename)
-                if type == 'Сравнительная таблица изменения стоимости МТР по договору подряда (Форма 1.3)':
-                    new_name = self.create_name_for_6_MTR_cost_change_table(filepath, filename)
-                if type_id in self.TYPES_7_AND_THEIR_CODENAMES.keys():
-                    if extension == '.pdf':
-                        new_name, type, mask = self.create_name_for_7_other_expenses(filename, filepath, pdf_text_cache)
-                    if extension in ['.xls', '.xlsx']:
-                        new_name, type, mask = self.create_name_for_7_other_expenses(filename, filepath, excel_text_cache)
-                if type_id in self.TYPES_8_AND_THEIR_CODENAMES.keys():
-                    new_name = self.create_name_for_8_supporting_documents(filename, type_id)
-
-                # занесение всех полученных данных заносим в словарь
-                self.filenames[filename] = {
-                    'type': type,
-                    'new_name': new_name,
-                    'mask': mask,
-                    'extension': extension,
-                    'filepath': filepath,
-                    'estimate_number': estimate_number,
-                    }
-                files_count += 1
-                percent_processed = files_count * 100 // len(files)
-                self.ui.progressBar.setValue(percent_processed)
-                self.ui.loading_label.setText(f'Обработано файлов: {files_count} из {len(files)}')
-                QtWidgets.QApplication.processEvents()
+        self.traverse_thread = QtCore.QThread()
+        self.traverse_worker = TraverseWorker(self._scan_directory)
+        self.traverse_worker.moveToThread(self.traverse_thread)
+        self.traverse_thread.started.connect(self.traverse_worker.run)
+        self.traverse_worker.progress.connect(self._on_traverse_progress)
+        self.traverse_worker.finished.connect(self._on_traverse_finished)
+        self.traverse_thread.start()
+
+    def _on_traverse_progress(self, percent_processed, text):
+        '''Отображает ход обхода директории или обработки файлов'''
+        self.ui.progressBar.setValue(percent_processed)
+        self.ui.loading_label.setText(text)
+
+    def _on_traverse_finished(self, filenames):
+        '''Получает результат обхода директории и заполняет таблицу'''
+        if self.traverse_thread is None:
+            # окно уже закрывается
+            return
+        self.traverse_thread.quit()
+        self.traverse_thread.wait()
+        self.traverse_thread = None
+        self.traverse_worker = None
+        self._set_tags_editing_enabled(True)
+        self.filenames = filenames
         self.share_info_from_xls_to_duplicates()
         self.populate_table()
+        self.ocr_cache.save()
         self.ui.progressBar.setValue(0)
+        self.ui.SearchButton.setEnabled(True)
+        self.ui.ChoosePEDButton.setEnabled(True)
         self.logger.debug('=== КОНЕЦ traverse_directory ===')
 
-    def check_tags_in_pdf(self, text, tags):
+    def closeEvent(self, event):
+        '''Останавливает обход директории и обработку файлов, сохраняет несохраненные тэги при закрытии окна'''
+        self.tags_manager.flush()
+        if self.traverse_thread is not None:
+            self.traverse_cancelled = True
+            self.traverse_thread.quit()
+            self.traverse_thread.wait()
+            self.traverse_thread = None
+        if self.file_jobs_thread is not None:
+            # начатый файл дописывается, остальные не трогаем
+            self.file_jobs_cancelled = True
+            self.file_jobs_thread.quit()
+            self.file_jobs_thread.wait()
+            self.file_jobs_thread = None
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+        super().closeEvent(event)
+
+    def _get_process_pool(self):
+        """Пул процессов распознавания PDF и чтения Excel. Создается при первом обходе и
+        переиспользуется следующими: процессы не запускаются заново, а Tesseract в них
+        остается загруженным"""
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor()
+        return self._process_pool
+
+    def _scan_directory(self, report_progress):
+        '''Обходит выбранную директорию; определяет типы файлов, вызывает функции для создания новых имен.
+        Выполняется в потоке обхода, поэтому к виджетам окна не обращается'''
+        filenames = dict()
+        files_count = 0
+
+        # обход дирректории, сначала поиск по имени файла
+        # тэги типов собираем в списки один раз на обход, а не перебираем словари для каждого файла.
+        # Подтипы 7.x по имени не ищутся, типы без тэгов внутри файла - по содержимому
+        self._name_type_index = [
+            (type_id, type_patterns['name_words'], type_patterns['name_regexes'])
+            for type_id, type_patterns in self.tags_manager.patterns.items() if '7.' not in type_id
+        ]
+        self._content_type_index = [
+            (type_id, type_data['type'], type_data['mask'], self.tags_manager.get_internal_patterns(type_id))
+            for type_id, type_data in self.tags_manager.tags_data.items()
+            if self.tags_manager.get_internal_patterns(type_id)
+        ]
+        found_files = []
+        file_entries = {}  # путь файла: DirEntry из обхода, в нем уже есть stat (на Windows)
+        for root, entries in self._walk_directory():
+            files_set = {entry.name for entry in entries}
+            for entry in entries:
+                filename = entry.name
+                if filename.startswith('~$'):
+                    continue
+                filepath = entry.path
+                file_entries[filepath] = entry
+                name_without_ext, extension = os.path.splitext(filename)
+                extension = extension.lower()
+                # у PDF есть excel-тёзка - тип и имя он получит от него
+                has_excel_twin = name_without_ext + '.xls' in files_set or name_without_ext + '.xlsx' in files_set
+                name_type_id = None
+                if self.search_in_name:
+                    name_type_id = self._find_type_in_name(filename)
+                found_files.append((filename, filepath, extension, has_excel_twin, name_type_id))
+
+        # результат прошлого поиска берем для файлов, которые не изменились на диске,
+        # если с тех пор не менялись тэги и настройки поиска
+        traversal_settings = (
+            json.dumps(self.tags_manager.tags_data, sort_keys=True, ensure_ascii=False),
+            self.search_in_name, self.search_in_file, self.ex_name_comment, self.ex_name_len
+        )
+        traversal = {}
+        reused_files = {}
+        file_keys = {}
+        for filename, filepath, extension, has_excel_twin, name_type_id in found_files:
+            try:
+                stat = file_entries[filepath].stat()
+            except OSError:
+                continue
+            file_keys[filepath] = (stat.st_size, stat.st_mtime_ns, has_excel_twin, name_type_id, traversal_settings)
+            previous = self._last_traversal.get(filepath)
+            if previous is not None and previous[0] == file_keys[filepath]:
+                reused_files[filepath] = dict(previous[1])
+                traversal[filepath] = previous
+
+        # PDF, которые придется распознавать, и Excel, которые придется читать, сразу
+        # отправляем в процессы - по порядку обхода. Пока они читаются на всех ядрах,
+        # файлы обрабатываются по порядку, содержимое файла ожидается только когда дошли до него.
+        # Процессы запускаются при первой отправке файла, без таких файлов пул ничего не стоит
+        file_contents, ocr_keys = self.read_files_in_processes(self._get_process_pool(), [
+            (filepath, extension) for filename, filepath, extension, has_excel_twin, name_type_id in found_files
+            if filepath not in reused_files and (
+                self._pdf_needs_ocr(extension, has_excel_twin, name_type_id)
+                or self._excel_needs_reading(extension, name_type_id))
+        ])
+
+        try:
+            # прогресс сообщаем примерно на каждый процент, а не на каждый файл
+            progress_step = max(1, len(found_files) // 100)
+            for filename, filepath, extension, has_excel_twin, name_type_id in found_files:
+                if self.traverse_cancelled:
+                    break
+                if filepath in reused_files:
+                    filenames[filename] = reused_files[filepath]
+                else:
+                    file_content, read_ok = self._get_file_content(file_contents, ocr_keys, filepath, extension)
+                    file_info, type_id = self._classify_file(
+                        filename, filepath, extension, has_excel_twin, name_type_id, file_content)
+                    filenames[filename] = file_info
+                    # имена 7 и 8 типов нумеруются по порядку обхода, их результат не переиспользуем.
+                    # Файл, который не удалось прочитать (занят Office, ошибка OCR), тоже не
+                    # запоминаем - при следующем поиске он будет прочитан заново
+                    if (read_ok and filepath in file_keys and type_id not in self.TYPES_7_AND_THEIR_CODENAMES
+                            and type_id not in self.TYPES_8_AND_THEIR_CODENAMES):
+                        traversal[filepath] = (file_keys[filepath], dict(file_info))
+                files_count += 1
+                if files_count % progress_step == 0 or files_count == len(found_files):
+                    percent_processed = files_count * 100 // len(found_files)
+                    report_progress(percent_processed, f'Обработано файлов: {files_count} из {len(found_files)}')
+        finally:
+            # пул общий для всех обходов - файлы, до которых обход не дошел, снимаем с очереди
+            for content in file_contents.values():
+                if isinstance(content, Future):
+                    content.cancel()
+        if self.traverse_cancelled:
+            self._last_traversal.update(traversal)
+        else:
+            self._last_traversal = traversal
+        return filenames
+
+    def _classify_file(self, filename, filepath, extension, has_excel_twin, name_type_id, file_content):
+        '''Определяет тип файла и создает для него новое имя. file_content - заранее прочитанный
+        текст PDF или строки Excel (None - прочитать при необходимости).
+        Возвращает данные для таблицы и id типа'''
+        type = self.UNKNOWN
+        new_name = self.UNKNOWN
+        mask = self.UNKNOWN
+        estimate_number = ''
+        pdf_text_cache = file_content if extension == '.pdf' else None
+        excel_text_cache = file_content if extension in ['.xls', '.xlsx'] else None
+
+        type_found_in_name = name_type_id is not None
+        if type_found_in_name:
+            type_id = name_type_id
+            type = self.tags_manager.tags_data[type_id]['type']
+            mask = self.tags_manager.tags_data[type_id]['mask']
+
+        # Если в имени не найдено, ищем внутри файла (только в тех, что умеем читать)
+        # PDF с excel-тёзкой не проверяем - тип он получит от тёзки
+        if (not type_found_in_name and self.search_in_file and extension in searchable_extensions
+                and not (extension == '.pdf' and has_excel_twin)):
+            # текст файла готовим один раз, для каждого типа только проверяем шаблон
+            excel_rows = None
+            if extension == '.pdf':
+                if pdf_text_cache is None:
+                    pdf_text_cache = self.extract_text_from_pdf_first_page(filepath)
+            else:
+                if excel_text_cache is None:
+                    excel_text_cache = self.read_xls_xlsx_file(filepath)
+                if excel_text_cache is not None:
+                    excel_rows = self._join_excel_rows(excel_text_cache).tolist()
+            content_type = self._find_type_by_content(extension, pdf_text_cache, excel_rows)
+            if (content_type is None and excel_text_cache is not None
+                    and len(excel_text_cache) >= excel_header_rows):
+                # в шапке листа тэгов нет - проверяем лист целиком. Если строк прочитано
+                # меньше лимита, лист уже прочитан до конца и второе чтение не нужно
+                full_sheet = self.read_xls_xlsx_file(filepath, max_rows=None)
+                if full_sheet is not None:
+                    content_type = self._find_type_by_content(
+                        extension, None, self._join_excel_rows(full_sheet).tolist())
+            if content_type is not None:
+                type_id, type, mask = content_type
+        if type == '?':
+            type_id = 0
+        # вызов функции для создания имени в соответствии с типом файла:
+        if type_id in ['1', '2', '3']:
+            new_name_result = None
+            if extension == '.pdf':
+                if not has_excel_twin:
+                    new_name_result = self.create_name_for_123_local_object_summary_estimates(filepath, filename, pdf_text_cache, type_id)
+            elif extension in ['.xls', '.xlsx']:
+                new_name_result = self.create_name_for_123_local_object_summary_estimates(filepath, filename, excel_text_cache, type_id)
+            if new_name_result is not None:
+                new_name = new_name_result[0]
+                estimate_number = new_name_result[1]
+
+        if type == 'Сводный реестр сметной документации':
+            new_name = self.create_name_for_4_register_of_estimates(filepath, filename)
+        if type == 'Сметные расчеты на отдельные виды затрат':
+            new_name = self.create_name_for_5_specific_types_of_costs(filepath, filename)
+        if type == 'Сравнительная таблица изменения стоимости МТР по договору подряда (Форма 1.3)':
+            new_name = self.create_name_for_6_MTR_cost_change_table(filepath, filename)
+        if type_id in self.TYPES_7_AND_THEIR_CODENAMES.keys():
+            if extension == '.pdf':
+                new_name, type, mask = self.create_name_for_7_other_expenses(filename, filepath, pdf_text_cache)
+            if extension in ['.xls', '.xlsx']:
+                new_name, type, mask = self.create_name_for_7_other_expenses(filename, filepath, excel_text_cache)
+        if type_id in self.TYPES_8_AND_THEIR_CODENAMES.keys():
+            new_name = self.create_name_for_8_supporting_documents(filename, type_id)
+
+        # занесение всех полученных данных заносим в словарь
+        file_info = {
+            'type': type,
+            'new_name': new_name,
+            'mask': mask,
+            'extension': extension,
+            'filepath': filepath,
+            'estimate_number': estimate_number,
+            }
+        return file_info, type_id
+
+    def _walk_directory(self):
+        '''Возвращает папки директории вместе со списками DirEntry их файлов (вложенные папки -
+        если выбран поиск в них). os.scandir сразу знает тип записи, а на Windows и размер
+        с датой изменения, лишних stat не делается'''
+        directories = [self.directory]
+        while directories:
+            root = directories.pop()
+            files = []
+            subdirectories = []
+            try:
+                with os.scandir(root) as entries:
+                    for entry in entries:
+                        # как и os.walk, в ссылки на папки не заходим - иначе возможен бесконечный обход
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirectories.append(entry.path)
+                        # ~$ - временные файлы-блокировки открытого в Office документа
+                        elif entry.is_file() and not entry.name.startswith('~$'):
+                            files.append(entry)
+            except OSError as e:
+                self.logger.error(f'Ошибка чтения папки {root}: {str(e)}')
+                continue
+            yield root, files
+            if self.search_in_subfolders:
+                # в обратном порядке, чтобы папки обходились в порядке os.walk
+                directories.extend(reversed(subdirectories))
+
+    def _find_type_in_name(self, filename):
+        '''Ищет тэги типов в имени файла, возвращает id найденного типа или None'''
+        file_parts = set(re.split(r'[_\-. ]+', filename.lower()))
+        for type_id, name_words, name_regexes in self._name_type_index:
+            if name_words & file_parts or any(pattern.search(filename) for pattern in name_regexes):
+                return type_id
+        return None
+
+    def _pdf_needs_ocr(self, extension, has_excel_twin, name_type_id):
+        """Определяет, понадобится ли при обработке файла текст первой страницы PDF"""
+        if extension != '.pdf':
+            return False
+        if name_type_id in self.TYPES_7_AND_THEIR_CODENAMES:
+            return True
+        if has_excel_twin:
+            return False
+        if name_type_id is None:
+            return self.search_in_file
+        return name_type_id in ['1', '2', '3']
+
+    def _find_type_by_content(self, extension, pdf_text, excel_rows):
+        """Первый тип, тэги которого нашлись в тексте PDF или строках excel: (id, тип, маска) или None"""
+        for type_id, type_name, type_mask, patterns in self._content_type_index:
+            if extension == '.pdf':
+                presence_tags = self.check_tags_in_pdf(pdf_text, patterns)
+            else:
+                presence_tags = self.check_tags_in_excel(excel_rows, patterns)
+            if presence_tags:
+                return type_id, type_name, type_mask
+        return None
+
+    def check_tags_in_pdf(self, text, patterns):
         """Проверяет наличие тегов в тексте"""
         if not text:
             return False
-        for tag in tags:
-            try:
-                if re.search(tag, text, re.IGNORECASE):
-                    return True
-            except re.error:
-                if tag.lower() in text:
-                    return True
-        return False
+        return any(pattern.search(text) for pattern in patterns)
 
-    def check_tags_in_excel(self, file_data, tags):
-        """Проверяет наличие тегов в Excel файле"""
-        if file_data is None or file_data.empty:
+    def check_tags_in_excel(self, rows, patterns):
+        """Проверяет наличие тегов в строках Excel файла (склеенных _join_excel_rows)"""
+        if not rows:
             return False
-        for i in range(len(file_data)):
-            row_data = ''.join([str(x).lower() for x in file_data.iloc[i].values.tolist() if pd.notna(x)])
-            for tag in tags:
-                try:
-                    if re.search(tag, row_data, re.IGNORECASE):
-                        return True
-                except re.error:
-                    if tag.lower() in row_data:
-                        return True
-        return False
+        return any(pattern.search(row) for row in rows for pattern in patterns)
+
+    def _join_excel_rows(self, file_data):
+        """Склеивает ячейки каждой строки Excel в одну строку в нижнем регистре.
+        Склейка идет по столбцам средствами pandas, а не циклом по строкам"""
+        import pandas as pd
+        if file_data.empty:
+            return pd.Series([], dtype=str)
+        cells = file_data.fillna('').astype(str)
+        rows = cells.iloc[:, 0].str.cat([cells.iloc[:, i] for i in range(1, cells.shape[1])])
+        return rows.str.lower()
 
     def extract_text_from_pdf_first_page(self, pdf_path, lang='rus+eng'):
         """Извлекает текст с первой страницы PDF используя OCR"""
+        cache_key = self.ocr_cache.file_key(pdf_path)
+        text = self.ocr_cache.get(cache_key)
+        if text is not None:
+            return text
         try:
-            # Конвертируем первую страницу PDF в изображение
-            images = convert_from_path(
-                pdf_path, 
-                first_page=1, 
-                last_page=1, 
-                dpi=300,
-                poppler_path=poppler_path
-            )
-            if not images:
-                return ''
-            # Сохраняем временное изображение
-            with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as temp_file:
-                images[0].save(temp_file.name, 'JPEG')
-                temp_image_path = temp_file.name
-            # Распознаем текст с изображения
-            pytesseract.pytesseract.tesseract_cmd = tesseract_path
-            text = pytesseract.image_to_string(Image.open(temp_image_path), lang=lang)
-            # Удаляем временный файл
-            os.unlink(temp_image_path)
+            text = ocr_first_page(pdf_path, lang, poppler_path, tesseract_path)
             self.logger.debug(f'прочили PDF {pdf_path}')
-            return text.lower()
+            self.ocr_cache.set(cache_key, text)
+            return text
         except Exception as e:
             self.logger.error(f'Ошибка OCR обработки {pdf_path}: {str(e)}')
             return ''
 
+    def _excel_needs_reading(self, extension, name_type_id):
+        """Определяет, понадобится ли при обработке файла содержимое Excel"""
+        if extension not in ['.xls', '.xlsx']:
+            return False
+        if name_type_id is None:
+            return self.search_in_file
+        return name_type_id in ['1', '2', '3'] or name_type_id in self.TYPES_7_AND_THEIR_CODENAMES
+
+    def read_files_in_processes(self, executor, files, lang='rus+eng'):
+        """Отправляет чтение файлов во все ядра процессора: распознавание первой страницы
+        PDF и чтение первых строк Excel. Для каждого файла возвращает текст из кэша OCR
+        или Future чтения, а также ключи кэша OCR для PDF (чтобы не считать их второй раз)"""
+        contents = {}
+        ocr_keys = {}
+        for filepath, extension in files:
+            if extension == '.pdf':
+                ocr_keys[filepath] = self.ocr_cache.file_key(filepath)
+                content = self.ocr_cache.get(ocr_keys[filepath])
+                if content is None:
+                    content = executor.submit(ocr_first_page, filepath, lang, poppler_path, tesseract_path)
+            else:
+                content = executor.submit(read_excel_first_rows, filepath)
+            contents[filepath] = content
+        return contents, ocr_keys
+
+    def _get_file_content(self, contents, ocr_keys, filepath, extension):
+        """Возвращает прочитанное содержимое файла, при необходимости дожидаясь окончания чтения,
+        и признак успешного чтения"""
+        content = contents.get(filepath)
+        if not isinstance(content, Future):
+            return content, True
+        read_ok = True
+        try:
+            content = content.result()
+            if extension == '.pdf':
+                self.logger.debug(f'прочили PDF {filepath}')
+                self.ocr_cache.set(ocr_keys.get(filepath), content)
+            else:
+                self.logger.debug(f'прочили excel {filepath}')
+        except Exception as e:
+            read_ok = False
+            if isinstance(e, BrokenProcessPool):
+                # процесс пула аварийно завершился - следующий обход создаст новый пул
+                self._process_pool = None
+            if extension == '.pdf':
+                self.logger.error(f'Ошибка OCR обработки {filepath}: {str(e)}')
+                content = ''
+            else:
+                self.logger.error(f'Ошибка чтения файла {filepath}: {str(e)}')
+                content = None
+        contents[filepath] = content
+        return content, read_ok
+
     def share_info_from_xls_to_duplicates(self):
         """Если находятся файлы одинакового имени, но разного расширения, эта функция
         передаст инфу о типе и новом имени от xls файла тёскам других расширений"""
+        files_by_stem = defaultdict(list)
+        for filename, data in self.filenames.items():
+            files_by_stem[os.path.splitext(filename)[0]].append((filename, data))
         for filename, data in self.filenames.items():
             ext = data['extension']
             if ext in ['.xls', '.xlsx']:
                 name_without_ext = os.path.splitext(filename)[0]
-                for filename2, data2 in self.filenames.items():
-                    if os.path.splitext(filename2)[0] == name_without_ext and filename != filename2:
+                for filename2, data2 in files_by_stem[name_without_ext]:
+                    if filename != filename2:
                         data2['new_name'] = data['new_name']
                         data2['type'] = data['type']
                         data2['mask'] = data['mask']
                         data2['estimate_number'] = data['estimate_number']
 
-    def read_xls_xlsx_file(self, filepath):
-        """Прочесть excel файлы"""
+    def read_xls_xlsx_file(self, filepath, max_rows=excel_header_rows):
+        """Прочесть первые max_rows строк excel файла, при max_rows=None - весь лист"""
         if os.path.basename(filepath).startswith('~$'):
             return None
         if not os.path.exists(filepath):
@@ -508,115 +1344,29 @@ class PEDSorterApp(QtWidgets.QMainWindow):
             return None
         try:
             self.logger.debug(f'прочили excel {filepath}')
-            if str(filepath).lower().endswith('.xlsx'):
-                return self._read_xlsx_visible_sheet(filepath)
-            elif str(filepath).lower().endswith('.xls'):
-                return self._read_xls_visible_sheet(filepath)
-            else:
-                return None
+            return read_excel_first_rows(filepath, max_rows)
         except Exception as e:
             self.logger.error(f'Ошибка чтения файла {filepath}: {str(e)}')
             return None
-        finally:
-            gc.collect()
-
-    def _read_xlsx_visible_sheet(self, filepath):
-        """Чтение первого видимого листа для xlsx"""
-        try:
-            from openpyxl import load_workbook
-            wb = load_workbook(filepath, read_only=True)
-            visible_sheet_name = None
-            for sheet_name in wb.sheetnames:
-                sheet = wb[sheet_name]
-                if sheet.sheet_state == 'visible':
-                    visible_sheet_name = sheet_name
-                    break
-            if visible_sheet_name is None:
-                for sheet_name in wb.sheetnames:
-                    if not sheet_name.startswith('_'):
-                        visible_sheet_name = sheet_name
-                        break
-            if visible_sheet_name is None:
-                self.logger.warning(f'Не найдено видимых листов в {filepath}')
-                return None
-            data = pd.read_excel(filepath, sheet_name=visible_sheet_name, header=None, engine='openpyxl')
-            wb.close()
-            return data
-        except ImportError:
-            return self._read_fallback(filepath, 'openpyxl')
-        finally:
-            import gc
-            gc.collect()
-
-    def _read_xls_visible_sheet(self, filepath):
-        """Чтение первого видимого листа для xls"""
-        try:
-            with pd.ExcelFile(filepath, engine='xlrd') as excel_file:
-                system_keywords = ['_', 'sheet', 'hidden', 'veryhidden', 'sys', 'temp']
-                for sheet_name in excel_file.sheet_names:
-                    sheet_lower = sheet_name.lower()
-                    if any(keyword in sheet_lower for keyword in system_keywords):
-                        continue
-                    if sheet_lower.startswith(('~', '$')) or len(sheet_name.strip()) == 0:
-                        continue
-                    try:
-                        sheet_data = pd.read_excel(excel_file, sheet_name=sheet_name, header=None)
-                        if not sheet_data.empty:
-                            return sheet_data
-                    except:
-                        continue
-                for sheet_name in excel_file.sheet_names:
-                    if not sheet_name.startswith('_'):
-                        return pd.read_excel(excel_file, sheet_name=sheet_name, header=None)
-                return None
-        except Exception as e:
-            self.logger.error(f'Ошибка чтения XLS {filepath}: {str(e)}')
-            return None
-
-    def _read_fallback(self, filepath, engine):
-        """Резервный метод чтения"""
-        try:
-            with pd.ExcelFile(filepath, engine=engine) as excel_file:
-                for sheet_name in excel_file.sheet_names:
-                    if not sheet_name.startswith('_'):
-                        return pd.read_excel(excel_file, sheet_name=sheet_name, header=None)
-                return None
-        except:
-            return None
 
     def _create_comment(self, filename):
         if self.ex_name_comment:
-            return f'-(ex {filename[:min(self.ex_name_len, len(filename))]}...)'
+            return f'-(ex {filename[:self.ex_name_len]}...)'
         return ''
 
     def create_name_for_123_local_object_summary_estimates(self, filepath, filename, file_data, type_id):
         """Создает новые имена для лоальных, объектных, сводных смет (залезает внутрь, ищет номер сметы)"""
-        if type_id == '1':
-            ESTIMATE_NUMBER_UNKNOWN = '??-??-??'
-            const = 'ЛС'
-            number_mask = r'^\d{1,2}-\d{1,2}(?:-\d{1,2})?$'
-        elif type_id == '2':
-            ESTIMATE_NUMBER_UNKNOWN = '??-??'
-            const = 'ОС'
-            number_mask = r'^\d{1,2}(?:-\d{1,2})?$'
-        elif type_id == '3':
-            ESTIMATE_NUMBER_UNKNOWN = '??'
-            const = 'ССР'
-            number_mask = r'^\d{1,2}$'
-
-        tags = self.tags_manager.tags_data[type_id]["internal_tags"]
+        const, ESTIMATE_NUMBER_UNKNOWN, number_mask = self.TYPES_123_NAMING[type_id]
+        tags_patterns = self.tags_manager.get_internal_patterns(type_id)
         lines_to_check = 20 # в скольких первых строках искать совпадения. весь файл = len(file)
-        version = self.DEFAULT_VERSION
-        version_number = self.DEFAULT_VERSION_NUMBER
         estimate_number = ESTIMATE_NUMBER_UNKNOWN
         candidate = ''
         data_lines = []
         if filename.endswith(('.xls', '.xlsx')):
             if file_data is None:
                 file_data = self.read_xls_xlsx_file(filepath)
-            for i in range(min(lines_to_check, len(file_data))):
-                row_data = ''.join([str(x).lower() for x in file_data.iloc[i].values.tolist() if pd.notna(x)])
-                data_lines.append(row_data)
+            if file_data is not None: # нечитаемый excel - номер/тип остается неизвестным
+                data_lines = self._join_excel_rows(file_data.head(lines_to_check)).tolist()
         elif filename.endswith('.pdf'):
             if file_data is None:
                 file_data = self.extract_text_from_pdf_first_page(filepath)
@@ -625,53 +1375,36 @@ class PEDSorterApp(QtWidgets.QMainWindow):
             return None
 
         for row_data in data_lines:
-            for tag in map(str.lower, tags):
-                if re.search(tag, row_data, re.IGNORECASE):
-                    if '№' in row_data:
-                        candidate = row_data.split('№')[-1].strip()
-                    elif 'ne' in row_data:
-                        candidate = row_data.split('ne')[-1].strip() # дело в том, что тиссеракт иногда распознает знак "№" как "Ne"
-                    else:
-                        candidate = row_data.split('n')[-1].strip()
-                    if re.search(number_mask, candidate):
-                        estimate_number = candidate
-                        break
+            if any(pattern.search(row_data) for pattern in tags_patterns):
+                if '№' in row_data:
+                    candidate = row_data.split('№')[-1].strip()
+                elif 'ne' in row_data:
+                    candidate = row_data.split('ne')[-1].strip() # дело в том, что тиссеракт иногда распознает знак "№" как "Ne"
+                else:
+                    candidate = row_data.split('n')[-1].strip()
+                if number_mask.search(candidate):
+                    estimate_number = candidate
             if candidate:
                 break
         comment = self._create_comment(filename)
-        return (f'{const}-{estimate_number}-{version}{version_number}{comment}', candidate)
+        return (f'{const}-{estimate_number}-{self.VERSION}{comment}', candidate)
 
     def create_name_for_4_register_of_estimates(self, filepath, filename):
         """Создает новые имена для файлов типа 'Сводный реестр сметной документации'"""
-        version = self.DEFAULT_VERSION
-        const = 'СРСД'
-        version_number = self.DEFAULT_VERSION_NUMBER
-        comment = self._create_comment(filename)
-        return f'{const}-{version}{version_number}{comment}'
+        return self.NAMES_4_5_6['4'] + self._create_comment(filename)
 
     def create_name_for_5_specific_types_of_costs(self, filepath, filename):
         """Создает новые имена для файлов типа 'Сметные расчеты на отдельные виды затрат'"""
-        version = self.DEFAULT_VERSION
-        const = 'СРОВЗ'
-        version_number = self.DEFAULT_VERSION_NUMBER
-        comment = self._create_comment(filename)
-        return f'{const}-{version}{version_number}{comment}'
+        return self.NAMES_4_5_6['5'] + self._create_comment(filename)
     
     def create_name_for_6_MTR_cost_change_table(self, filepath, filename):
         """Создает новые имена для файлов типа 'Сравнительная таблица изменения стоимости МТР по договору подряда (Форма 1.3)'"""
-        version = self.DEFAULT_VERSION
-        const = 'ФОРМА1.3'
-        version_number = self.DEFAULT_VERSION_NUMBER
-        comment = self._create_comment(filename)
-        return f'{const}-{version}{version_number}{comment}'
+        return self.NAMES_4_5_6['6'] + self._create_comment(filename)
     
     def create_name_for_7_other_expenses(self, filename, filepath, file_data):
         """Создает новые имена для всех файлов типа 'Расчеты на прочие затраты'"""
-        version = self.DEFAULT_VERSION
         const = 'ПРОЧ'
-        version_number = self.DEFAULT_VERSION_NUMBER
         type_of_calculation = '?'
-        comment = self._create_comment(filename)
         lines_to_check = 20
         amount_of_documents_7_type = 1
         data_lines = []
@@ -679,21 +1412,21 @@ class PEDSorterApp(QtWidgets.QMainWindow):
         if filename.endswith(('.xls', '.xlsx')):
             if file_data is None:
                 file_data = self.read_xls_xlsx_file(filepath)
-            for i in range(min(lines_to_check, len(file_data))):
-                row_data = ''.join([str(x).lower() for x in file_data.iloc[i].values.tolist() if pd.notna(x)])
-                data_lines.append(row_data)
+            if file_data is not None: # нечитаемый excel - номер/тип остается неизвестным
+                data_lines = self._join_excel_rows(file_data.head(lines_to_check)).tolist()
         elif filename.endswith('.pdf'):
             if file_data is None:
                 file_data = self.extract_text_from_pdf_first_page(filepath)
             data_lines = file_data.split('\n')[:lines_to_check]
         else:
             return None
+        # без совпадений счетчик берется у последнего типа, как и после полного перебора
+        type_id = next(reversed(self.TYPES_7_AND_THEIR_CODENAMES))
         for row_data in data_lines:
             for type_id in self.TYPES_7_AND_THEIR_CODENAMES.keys():
-                for tag in types_base[type_id]['internal_tags']:
-                    if re.search(tag, row_data, re.IGNORECASE):
-                        type_of_calculation = self.TYPES_7_AND_THEIR_CODENAMES[type_id][1]
-                        break
+                tags_patterns = self.tags_manager.get_internal_patterns(type_id)
+                if any(pattern.search(row_data) for pattern in tags_patterns):
+                    type_of_calculation = self.TYPES_7_AND_THEIR_CODENAMES[type_id][1]
                 if type_of_calculation !='?':
                     break
             if type_of_calculation != '?':
@@ -703,133 +1436,116 @@ class PEDSorterApp(QtWidgets.QMainWindow):
         comment = self._create_comment(filename)
         type = self.TYPES_7_AND_THEIR_CODENAMES[type_id][0]
         if amount_of_documents_7_type > 1:
-            return (f'{const}-{type_of_calculation}-{amount_of_documents_7_type}-{version}{version_number}{comment}',
+            return (f'{const}-{type_of_calculation}-{amount_of_documents_7_type}-{self.VERSION}{comment}',
                     self.TYPES_7_AND_THEIR_CODENAMES[type_id][0],
                     types_base[type_id]['mask']
                     )
-        return (f'{const}-{type_of_calculation}-{version}{version_number}{comment}',
+        return (f'{const}-{type_of_calculation}-{self.VERSION}{comment}',
                 self.TYPES_7_AND_THEIR_CODENAMES[type_id][0],
                 types_base[type_id]['mask']
                 )
 
     def create_name_for_8_supporting_documents(self, filename, type_id):
         """Создает новые имена для всех файлов типа 'Подтверждающие документы'"""
-        version = self.DEFAULT_VERSION
         const = 'ПОДТВ'
-        version_number = self.DEFAULT_VERSION_NUMBER
         type_of_document = self.TYPES_8_AND_THEIR_CODENAMES[type_id][1]
         amount_of_documents_8_type = self.TYPES_8_AND_THEIR_CODENAMES[type_id][2]
         self.TYPES_8_AND_THEIR_CODENAMES[type_id][2] += 1
         comment = self._create_comment(filename)
         if type_of_document == 'Обоснование к расчету прочих затрат':
-            return f'{const}-{type_of_document}-ТИППРОЧ-{amount_of_documents_8_type}-{version}{version_number}{comment}'
+            return f'{const}-{type_of_document}-ТИППРОЧ-{amount_of_documents_8_type}-{self.VERSION}{comment}'
         else:
-            return f'{const}-{type_of_document}-{amount_of_documents_8_type}-{version}{version_number}{comment}'
+            return f'{const}-{type_of_document}-{amount_of_documents_8_type}-{self.VERSION}{comment}'
 
     def populate_table(self):
         '''Заполняет таблицу найденными файлами.'''
-        self.ui.Table.setRowCount(len(self.filenames))
-        for row, (filename, data) in enumerate(self.filenames.items()):
-            self.ui.Table.setItem(row, 0, QtWidgets.QTableWidgetItem(filename))
-            self.ui.Table.setItem(row, 1, QtWidgets.QTableWidgetItem(data['type']))
-            self.ui.Table.setItem(row, 2, QtWidgets.QTableWidgetItem(data['mask']))
-            self.ui.Table.setItem(row, 3, QtWidgets.QTableWidgetItem(data['new_name'] + data['extension']))
-            self.ui.Table.setItem(row, 5, QtWidgets.QTableWidgetItem(data['estimate_number']))
-
-            #ЦВЕТА и чекбоксы!
-            checkbox_item = QtWidgets.QTableWidgetItem()
-            if data['type'] == '?': # красный - тип неизвестен
-                checkbox_item.setFlags(QtCore.Qt.ItemIsEnabled)
-                checkbox_item.setCheckState(QtCore.Qt.Unchecked)
-                color = QtGui.QColor(238, 186, 175)
-            elif '?' in data['new_name']: # желтый - тип предполагаем, но имя составили не доконца
-                checkbox_item.setFlags(QtCore.Qt.ItemIsEnabled)
-                checkbox_item.setCheckState(QtCore.Qt.Unchecked)
-                color = QtGui.QColor(238, 223, 175) 
-            else: # зеленый - все сделал
-                checkbox_item.setFlags(QtCore.Qt.ItemIsUserCheckable | QtCore.Qt.ItemIsEnabled)
-                checkbox_item.setCheckState(QtCore.Qt.Checked)
-                color = QtGui.QColor(213, 238, 175)
-            self.ui.Table.setItem(row, 4, checkbox_item)
-            for col in range(self.ui.Table.columnCount()):
-                self.ui.Table.item(row, col).setBackground(color)
+        # модель заменяет все строки разом, представление рисует только видимые строки.
+        # Цвет строки и чекбокс модель выбирает по статусу
+        self.table_model.set_rows(self.filenames)
+        self._rebuild_new_name_index()
 
         self.setCursor(QtGui.QCursor(QtCore.Qt.ArrowCursor))
-        QtWidgets.QApplication.restoreOverrideCursor()
         self.ui.loading_label.setText(f'Готово! всего файлов: {len(self.filenames.keys())}')
         self.table_is_full = True
         self.amount_of_documents_8_type = 0
         self.ui.Rename_Button.setEnabled(True)
     
-    def open_file_in_explorer(self, row, column):
+    def open_file_in_explorer(self, index):
         '''Открывает файл в проводнике при двойном клике на имя файла (колонка 0)'''
-        if column == 0:
-            filename_item = self.ui.Table.item(row, column)
-            if filename_item:
-                file_path = self.filenames[filename_item.text()]['filepath']
-            if os.path.exists(file_path):
-                if sys.platform == 'win32':
-                    import subprocess
-                    subprocess.Popen(f'explorer /select,"{os.path.abspath(file_path)}"')
-            else:
-                QtWidgets.QMessageBox.warning(self, 'Ошибка', f'Файл не найден:\n{file_path}')
+        if index.column() != 0:
+            return
+        file_path = self.table_model.rows()[index.row()]['info']['filepath']
+        if os.path.exists(file_path):
+            if sys.platform == 'win32':
+                # список аргументов: путь передается как есть, без сборки и разбора строки команды
+                subprocess.Popen(['explorer', '/select,', os.path.abspath(file_path)])
+        else:
+            QtWidgets.QMessageBox.warning(self, 'Ошибка', f'Файл не найден:\n{file_path}')
 
-    def on_cell_changed(self, row, column):
-        """Обрабатывает изменения в ячейках таблицы"""
-        if column == 3 and self.table_is_full:
+    def on_new_name_edited(self, row):
+        """Обрабатывает изменение нового имени в таблице"""
+        if self.table_is_full:
+            self._update_new_name_index(row)
             self.update_row_status(row)
 
+    def _rebuild_new_name_index(self):
+        """Строит индекс новых имен таблицы для быстрой проверки на совпадения"""
+        self._row_new_names = [data['new_name'] + data['extension'] for data in self.filenames.values()]
+        self._rows_by_new_name = defaultdict(set)
+        for row, new_name in enumerate(self._row_new_names):
+            self._rows_by_new_name[new_name].add(row)
+        self._name_validity.clear()
+
+    def _update_new_name_index(self, row):
+        """Переносит строку в индексе новых имен после редактирования имени"""
+        if row >= len(self._row_new_names):
+            return
+        old_name = self._row_new_names[row]
+        self._rows_by_new_name[old_name].discard(row)
+        if not self._rows_by_new_name[old_name]:
+            del self._rows_by_new_name[old_name]
+        new_name = self.table_model.rows()[row]['new_name']
+        self._row_new_names[row] = new_name
+        self._rows_by_new_name[new_name].add(row)
+        # изменение имени может изменить результат проверки на совпадения у других строк
+        self._name_validity.clear()
+
     def update_row_status(self, row):
         """Обновляет статус строки на основе нового имени файла"""
-        name_item = self.ui.Table.item(row, 3)
-        if not name_item:
+        row_data = self.table_model.rows()[row]
+        is_valid = self.is_name_valid(row_data['new_name'], row)
+        status = 'done' if is_valid else 'incomplete'  # Зеленый или желтый
+        # статус строки не изменился - ни отметку, ни цвет трогать не нужно
+        if row_data['status'] == status:
             return
-        new_name = name_item.text()
-        is_valid = self.is_name_valid(new_name, row)
-        checkbox_item = self.ui.Table.item(row, 4)
-        if not checkbox_item:
-            return
-        if is_valid:
-            color = QtGui.QColor(213, 238, 175)  # Зеленый
-            checkbox_item.setFlags(QtCore.Qt.ItemIsUserCheckable | QtCore.Qt.ItemIsEnabled)
-            checkbox_item.setCheckState(QtCore.Qt.Checked)
-        else:
-            color = QtGui.QColor(238, 223, 175)  # Желтый
-            checkbox_item.setFlags(QtCore.Qt.ItemIsEnabled)  # Только для просмотра
-            checkbox_item.setCheckState(QtCore.Qt.Unchecked)
-
-        for col in range(self.ui.Table.columnCount()):
-            item = self.ui.Table.item(row, col)
-            if item:
-                item.setBackground(color)
+        # модель сообщает об изменении одной строки - перерисовывается только она
+        self.table_model.set_status(row, status)
 
     def is_name_valid(self, new_name, current_row):
-        """Проверяет валидность нового имени"""
+        """Проверяет валидность нового имени. Результат запоминается до следующего изменения имен в таблице"""
+        key = (current_row, new_name)
+        if key not in self._name_validity:
+            self._name_validity[key] = self._check_new_name(new_name, current_row)
+        return self._name_validity[key]
+
+    def _check_new_name(self, new_name, current_row):
+        """Проверяет новое имя: допустимые символы, расширение, совпадения с другими строками"""
         if not new_name.strip():
             return False
         if '?' in new_name:
             return False
-        for row in range(self.ui.Table.rowCount()):
-            if row == current_row:
-                continue
-            item = self.ui.Table.item(row, 3)
-            if item and item.text() == new_name:
-                return False
-        if not re.match(r'^[a-zA-Zа-яА-ЯёЁ0-9_\-\.\(\) ]+$', new_name):
+        if self._rows_by_new_name.get(new_name, set()) - {current_row}:
             return False
-
-        original_name_item = self.ui.Table.item(current_row, 0)
-        if not original_name_item:
+        if new_name.translate(self.VALID_NAME_CHARS):
             return False
 
-        original_name = original_name_item.text()
-        original_extension = os.path.splitext(original_name)[1].lower()
+        # расширение исходного файла уже вычислено при обходе директории
+        original_extension = self.table_model.rows()[current_row]['info']['extension']
 
-        new_extension = os.path.splitext(new_name)[1].lower()
-        if new_extension != original_extension:
+        new_name_without_ext, new_extension = os.path.splitext(new_name)
+        if new_extension.lower() != original_extension:
             return False
 
-        new_name_without_ext = os.path.splitext(new_name)[0]
         if not new_name_without_ext.strip():
             return False
 
@@ -841,7 +1557,7 @@ class PEDSorterApp(QtWidgets.QMainWindow):
         """Копирует файлы с новыми именами"""
         if self.ui.rename_radioButton_this_files.isChecked():
             # Режим переименования исходных файлов
-            target_path = Path(self.directory)
+            target_path = self.directory
             operation = "переименовано"
         else:
             # Режим копирования
@@ -851,114 +1567,334 @@ class PEDSorterApp(QtWidgets.QMainWindow):
                 )
                 if not target_dir:
                     return
-                target_path = Path(target_dir)
+                target_path = target_dir
             else:
                 dir_name = self.ui.rename_lineEdit_dir_name.text().strip()
-                if not dir_name or not re.match(r'^[a-zA-Zа-яА-ЯёЁ0-9_\-\.\(\) ]+$', dir_name):
+                if not dir_name or dir_name.translate(self.VALID_NAME_CHARS):
                     QtWidgets.QMessageBox.warning(self, "Ошибка", "Введите корректное имя папки")
                     return
-                target_path = Path(self.directory) / dir_name
-                target_path.mkdir(exist_ok=True)
+                target_path = os.path.join(self.directory, dir_name)
+                # папка создается один раз до обработки строк таблицы
+                try:
+                    os.makedirs(target_path, exist_ok=True)
+                except OSError as e:
+                    QtWidgets.QMessageBox.warning(self, "Ошибка", f"Не удалось создать папку {target_path}: {str(e)}")
+                    return
             operation = "скопировано"
         results = {'success': 0, 'errors': 0, 'skipped': 0}
-        
-        for row in range(self.ui.Table.rowCount()):
-            checkbox_item = self.ui.Table.item(row, 4)
-            
-            if not checkbox_item or checkbox_item.checkState() != QtCore.Qt.Checked:
-                if not self.ui.checkBox_copy_undefined.isChecked():
+        jobs = self._collect_rename_jobs(target_path, results)
+
+        # файл уже лежит в папке назначения под нужным именем - ни копировать, ни
+        # переименовывать его не нужно (copy2 файла в самого себя закончится ошибкой).
+        # Пути сравниваем точно: смена только регистра букв (a.pdf -> A.pdf) - тоже переименование
+        remaining_jobs = []
+        for job in jobs:
+            if os.path.abspath(job[0]) == os.path.abspath(job[1]):
+                results['skipped'] += 1
+            else:
+                remaining_jobs.append(job)
+        jobs = remaining_jobs
+
+        # о перезаписи существующих файлов спрашиваем один раз, до начала работы.
+        # Содержимое папки читаем один раз вместо проверки каждого файла.
+        # При смене регистра "существующий" файл - это сам исходный файл, он не конфликт
+        # При переименовании файл, который сам будет переименован раньше, к моменту
+        # записи уже освободит место - о его перезаписи не спрашиваем
+        rename = self.ui.rename_radioButton_this_files.isChecked()
+        if rename:
+            jobs = self._order_rename_jobs(jobs)
+            pending_sources = {self._path_key(job[0]) for job in jobs}
+        else:
+            pending_sources = set()
+        existing_targets = self._list_directory(target_path)
+        conflicts = [
+            job for job in jobs
+            if os.path.normcase(job[3]) in existing_targets
+            and self._path_key(job[0]) != self._path_key(job[1])
+            and self._path_key(job[1]) not in pending_sources
+        ]
+        if conflicts and not self._confirm_overwrite(conflicts):
+            results['skipped'] += len(conflicts)
+            conflict_targets = {job[1] for job in conflicts}
+            jobs = [job for job in jobs if job[1] not in conflict_targets]
+            confirmed_targets = set()
+        else:
+            confirmed_targets = {self._path_key(job[1]) for job in conflicts}
+
+        # сами файлы обрабатываются в отдельном потоке: окно не зависает на больших
+        # файлах и медленных дисках. Все вопросы пользователю заданы выше
+        self._file_jobs_state = (operation, rename, results)
+        self.file_jobs_cancelled = False
+        self.setCursor(QtGui.QCursor(QtCore.Qt.BusyCursor))
+        self.ui.Rename_Button.setEnabled(False)
+        self.ui.SearchButton.setEnabled(False)
+        self.ui.ChoosePEDButton.setEnabled(False)
+        self.file_jobs_thread = QtCore.QThread()
+        self.file_jobs_worker = FileJobsWorker(
+            lambda report_progress: self._process_file_jobs(
+                jobs, rename, operation, confirmed_targets, report_progress))
+        self.file_jobs_worker.moveToThread(self.file_jobs_thread)
+        self.file_jobs_thread.started.connect(self.file_jobs_worker.run)
+        self.file_jobs_worker.progress.connect(self._on_traverse_progress)
+        self.file_jobs_worker.finished.connect(self._on_file_jobs_finished)
+        self.file_jobs_thread.start()
+
+    def _on_file_jobs_finished(self, outcome):
+        '''Получает итог переименования/копирования и сообщает его пользователю'''
+        if self.file_jobs_thread is None:
+            # окно уже закрывается
+            return
+        self.file_jobs_thread.quit()
+        self.file_jobs_thread.wait()
+        self.file_jobs_thread = None
+        self.file_jobs_worker = None
+        operation, rename, results = self._file_jobs_state
+        if rename:
+            # файл ищем по пути: если его уже переименовывали, ключ в self.filenames
+            # отличается от исходного имени в таблице
+            keys_by_path = {data['filepath']: key for key, data in self.filenames.items()}
+            for source_path, target_file_path, original_name, new_name in outcome['done']:
+                key = keys_by_path.get(source_path)
+                if key is None:
+                    continue
+                self.filenames[key]['filepath'] = target_file_path
+                self.filenames[new_name] = self.filenames.pop(key)
+        results['success'] += len(outcome['done'])
+        results['errors'] += len(outcome['errors'])
+        self.setCursor(QtGui.QCursor(QtCore.Qt.ArrowCursor))
+        self.ui.progressBar.setValue(0)
+        self.ui.loading_label.setText(f'Готово! всего файлов: {len(self.filenames)}')
+        self.ui.Rename_Button.setEnabled(True)
+        self.ui.SearchButton.setEnabled(True)
+        self.ui.ChoosePEDButton.setEnabled(True)
+
+        if outcome['errors']:
+            # ошибки всех файлов - одним сообщением, список - в подробностях
+            message_box = QtWidgets.QMessageBox(
+                QtWidgets.QMessageBox.Warning, 'Ошибка',
+                f'Не удалось обработать файлов: {len(outcome['errors'])}',
+                QtWidgets.QMessageBox.Ok, self
+            )
+            message_box.setDetailedText('\n'.join(
+                f'Ошибка: {original_name} -> {new_name}: {error}'
+                for original_name, new_name, error in outcome['errors']
+            ))
+            message_box.exec()
+        msg = (
+            f'Операция завершена:\n'
+            f'Успешно {operation}: {results['success']}\n'
+            f'Ошибок: {results['errors']}\n'
+            f'Пропущено: {results['skipped']}'
+        )
+        QtWidgets.QMessageBox.information(self, 'Результат работы', msg)
+
+    def _collect_rename_jobs(self, target_path, results):
+        """Проверяет отмеченные строки таблицы и собирает список файлов для
+        переименования/копирования: (исходный путь, новый путь, исходное имя, новое имя)"""
+        jobs = []
+        directory_listings = {}  # папка исходных файлов: ее содержимое
+        copy_undefined = self.ui.checkBox_copy_undefined.isChecked()
+        for row, (original_name, new_name, is_checked, file_info) in enumerate(self._snapshot_table()):
+            if not is_checked:
+                if not copy_undefined:
                     results['skipped'] += 1
                     continue
                 else:
-                    original_name_item = self.ui.Table.item(row, 0)
-                    new_name_item = original_name_item
-            else:
-                original_name_item = self.ui.Table.item(row, 0)
-                new_name_item = self.ui.Table.item(row, 3)
+                    new_name = original_name
             
-            if not original_name_item or not new_name_item:
+            if original_name is None or new_name is None:
                 results['errors'] += 1
                 continue
-            
-            original_name = original_name_item.text()
-            new_name = new_name_item.text()
 
             if not self.is_name_valid(new_name, row):
                 results['errors'] += 1
                 continue
 
-            if original_name not in self.filenames:
-                QtWidgets.QMessageBox.warning(self, 'Ошибка', f'Файл {original_name} не найден')
-                results['errors'] += 1
-                continue
-            
-            file_info = self.filenames[original_name]
-            source_path = Path(file_info['filepath'])
-            
-            if not source_path.exists():
+            source_path = file_info['filepath']
+            source_dir, source_name = os.path.split(source_path)
+            if source_dir not in directory_listings:
+                directory_listings[source_dir] = self._list_directory(source_dir)
+
+            if os.path.normcase(source_name) not in directory_listings[source_dir]:
                 QtWidgets.QMessageBox.warning(self, 'Ошибка', f'Файл не существует: {source_path}')
                 results['errors'] += 1
                 continue
-            
-            try:
-                target_file_path = target_path / new_name
 
-                if target_file_path.exists():
-                    reply = QtWidgets.QMessageBox.question(
-                        self, 'Файл существует',
-                        f'Файл {new_name} уже существует. Перезаписать?',
-                        QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No
-                    )
-                    if reply == QtWidgets.QMessageBox.No:
-                        results['skipped'] += 1
-                        continue
-
-                if self.ui.rename_radioButton_this_files.isChecked():
-                    source_path.rename(target_file_path)
-                    file_info['filepath'] = target_file_path
-                    self.filenames[new_name] = self.filenames.pop(original_name)
-                else:
-                    shutil.copy2(source_path, target_file_path)
-                
-                results['success'] += 1
-                self.logger.info(f"{operation.capitalize()}: {original_name} -> {new_name}")
-                
+            jobs.append((source_path, os.path.join(target_path, new_name), original_name, new_name))
+        return jobs
+
+    def _path_key(self, path):
+        """Путь для сравнения: абсолютный, без учета регистра на Windows"""
+        return os.path.normcase(os.path.abspath(path))
+
+    def _order_rename_jobs(self, jobs):
+        """Упорядочивает переименования так, чтобы файл, на место которого переименовывают
+        другой (1.pdf -> 2.pdf при 2.pdf -> 3.pdf), переименовывался первым"""
+        jobs_by_source = {self._path_key(job[0]): job for job in jobs}
+        ordered = []
+        placed = set()
+        for job in jobs:
+            # цепочка: каждое следующее задание освобождает место для предыдущего
+            chain = []
+            in_chain = set()
+            current = job
+            while current is not None:
+                source_key = self._path_key(current[0])
+                if source_key in placed or source_key in in_chain:
+                    # задание уже в очереди или цепочка замкнулась (1 -> 2, 2 -> 1):
+                    # тогда цель занята, и перед заменой файл будет пропущен с ошибкой
+                    break
+                chain.append(current)
+                in_chain.add(source_key)
+                current = jobs_by_source.get(self._path_key(current[1]))
+            for chained_job in reversed(chain):
+                ordered.append(chained_job)
+                placed.add(self._path_key(chained_job[0]))
+        return ordered
+
+    def _snapshot_table(self):
+        """Считывает из модели таблицы исходное имя, новое имя, отметку и данные файла каждой строки"""
+        return [(row['filename'], row['new_name'], row['checked'], row['info']) for row in self.table_model.rows()]
+
+    def _list_directory(self, directory):
+        """Содержимое папки одним чтением: имя (без учета регистра на Windows) - DirEntry"""
+        try:
+            with os.scandir(directory) as entries:
+                return {os.path.normcase(entry.name): entry for entry in entries}
+        except OSError:
+            return {}
+
+    def _confirm_overwrite(self, conflicts):
+        """Один вопрос о перезаписи всех уже существующих файлов, их список - в подробностях"""
+        message_box = QtWidgets.QMessageBox(
+            QtWidgets.QMessageBox.Question, 'Файлы существуют',
+            f'Уже существуют файлов: {len(conflicts)}. Перезаписать?',
+            QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No, self
+        )
+        message_box.setDetailedText('\n'.join(new_name for _, _, _, new_name in conflicts))
+        return message_box.exec() == QtWidgets.QMessageBox.Yes
+
+    def _process_file_jobs(self, jobs, rename, operation, confirmed_targets, report_progress):
+        """Переименовывает или копирует файлы. Выполняется в отдельном потоке, к виджетам
+        окна не обращается. Возвращает выполненные задания и ошибки (исходное имя, новое имя, текст)"""
+        outcome = {'done': [], 'errors': []}
+        if rename:
+            self._rename_source_files(jobs, confirmed_targets, outcome, report_progress)
+        else:
+            self._copy_files(jobs, outcome, report_progress)
+        self._log_done_files(operation, [f'{job[2]} -> {job[3]}' for job in outcome['done']])
+        return outcome
+
+    def _report_file_jobs_progress(self, report_progress, outcome, jobs_count, progress_step):
+        """Сообщает прогресс примерно на каждый процент, а не на каждый файл"""
+        processed = len(outcome['done']) + len(outcome['errors'])
+        if processed % progress_step == 0 or processed == jobs_count:
+            report_progress(processed * 100 // jobs_count, f'Обработано файлов: {processed} из {jobs_count}')
+
+    def _rename_source_files(self, jobs, confirmed_targets, outcome, report_progress):
+        """Переименовывает исходные файлы. Заменяет только те существующие файлы,
+        перезапись которых подтвердил пользователь"""
+        progress_step = max(1, len(jobs) // 100)
+        for job in jobs:
+            if self.file_jobs_cancelled:
+                break
+            source_path, target_file_path, original_name, new_name = job
+            target_key = self._path_key(target_file_path)
+            if (target_key not in confirmed_targets and target_key != self._path_key(source_path)
+                    and os.path.exists(target_file_path)):
+                # файл появился уже после вопроса о перезаписи (или не освободился,
+                # потому что его переименование не удалось) - не затираем его
+                outcome['errors'].append((original_name, new_name, 'Файл уже существует'))
+                self._report_file_jobs_progress(report_progress, outcome, len(jobs), progress_step)
+                continue
+            try:
+                # os.replace, в отличие от os.rename, на Windows заменяет существующий файл -
+                # перезапись уже подтверждена пользователем
+                os.replace(source_path, target_file_path)
+                outcome['done'].append(job)
+                self.logger.debug('Переименовано: %s -> %s', original_name, new_name)
             except Exception as e:
-                QtWidgets.QMessageBox.warning(self, 'Ошибка', f'Ошибка: {original_name} -> {new_name}: {str(e)}')
-                results['errors'] += 1
+                outcome['errors'].append((original_name, new_name, str(e)))
+            self._report_file_jobs_progress(report_progress, outcome, len(jobs), progress_step)
+
+    def _copy_files(self, copy_jobs, outcome, report_progress):
+        """Копирует файлы в несколько потоков: копирование упирается в диск, а не в процессор"""
+        progress_step = max(1, len(copy_jobs) // 100)
+        # два потока не должны писать один и тот же файл: на каждую цель остается одно
+        # задание (последнее, как при поочередном копировании), остальные - в ошибки
+        jobs_by_target = {}
+        for job in copy_jobs:
+            target_key = self._path_key(job[1])
+            if target_key in jobs_by_target:
+                duplicate = jobs_by_target[target_key]
+                outcome['errors'].append((duplicate[2], duplicate[3], 'Другой файл копируется под тем же именем'))
+                self._report_file_jobs_progress(report_progress, outcome, len(copy_jobs), progress_step)
+            jobs_by_target[target_key] = job
+        with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as executor:
+            futures = {
+                executor.submit(shutil.copy2, job[0], job[1]): job
+                for job in jobs_by_target.values()
+            }
+            for future in as_completed(futures):
+                if self.file_jobs_cancelled:
+                    for pending in futures:
+                        pending.cancel()
+                    break
+                job = futures[future]
+                try:
+                    future.result()
+                    outcome['done'].append(job)
+                    self.logger.debug('Скопировано: %s -> %s', job[2], job[3])
+                except Exception as e:
+                    outcome['errors'].append((job[2], job[3], str(e)))
+                self._report_file_jobs_progress(report_progress, outcome, len(copy_jobs), progress_step)
+
+    def _log_done_files(self, operation, done_pairs, limit=10):
+        """Одна запись в лог на всю операцию: количество файлов и первые из них"""
+        if not done_pairs:
+            return
+        listed = '; '.join(done_pairs[:limit])
+        if len(done_pairs) > limit:
+            listed += f'; ... еще {len(done_pairs) - limit}'
+        self.logger.info(f'{operation.capitalize()} файлов: {len(done_pairs)}: {listed}')
 
-        msg = (
-            f'Операция завершена:\n'
-            f'Успешно {operation}: {results['success']}\n'
-            f'Ошибок: {results['errors']}\n'
-            f'Пропущено: {results['skipped']}'
-        )
-        QtWidgets.QMessageBox.information(self, 'Результат работы', msg)
+
+_log_listener = None
 
 
 def setup_logging():
-    """Настройки логирования."""
+    """Настройки логирования. Запись в файл и консоль выполняет отдельный поток
+    QueueListener, вызовы логгера только кладут запись в очередь"""
+    global _log_listener
+    logger = logging.getLogger('PEDSorter')
+    if _log_listener is not None:
+        # логгер уже настроен другим окном - повторно обработчики не добавляем
+        return logger
+
     log_dir = "logs"
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
+    Path(log_dir).mkdir(exist_ok=True)
 
     log_file = os.path.join(log_dir, f'ped_sorter_{datetime.now().strftime('%Y%m%d')}.log')
 
-    logger = logging.getLogger('PEDSorter')
     logger.setLevel(logging.INFO)
 
     formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
 
+    # delay - файл лога открывается при первой записи, а не при запуске программы
     file_handler = RotatingFileHandler(
-        log_file, maxBytes=5*1024*1024, backupCount=3, encoding='utf-8'
+        log_file, maxBytes=5*1024*1024, backupCount=3, encoding='utf-8', delay=True
     )
     file_handler.setFormatter(formatter)
 
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(formatter)
 
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    log_queue = queue.Queue(-1)
+    logger.addHandler(QueueHandler(log_queue))
+    _log_listener = QueueListener(log_queue, file_handler, console_handler)
+    _log_listener.start()
+    # при выходе дописываем оставшиеся в очереди записи
+    atexit.register(_log_listener.stop)
 
     return logger
 
@@ -971,5 +1907,6 @@ def main():
     sys.exit(app.exec())
 
 if __name__ == '__main__':
+    multiprocessing.freeze_support()
     main()
 
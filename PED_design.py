@@ -19,7 +19,7 @@ from PySide6.QtWidgets import (QApplication, QCheckBox, QFrame, QHeaderView,
     QLabel, QLineEdit, QListWidget, QListWidgetItem,
     QMainWindow, QMenuBar, QProgressBar, QPushButton,
     QRadioButton, QSizePolicy, QSpinBox, QStatusBar,
-    QTableWidget, QTableWidgetItem, QWidget)
+    QTableView, QWidget)
 
 class Ui_MainWindow(object):
     def setupUi(self, MainWindow):
@@ -72,30 +72,7 @@ class Ui_MainWindow(object):
         self.label_8 = QLabel(self.files_frame)
         self.label_8.setObjectName(u"label_8")
         self.label_8.setGeometry(QRect(10, 0, 291, 16))
-        self.Table = QTableWidget(self.files_frame)
-        if (self.Table.columnCount() < 6):
-            self.Table.setColumnCount(6)
-        __qtablewidgetitem = QTableWidgetItem()
-        __qtablewidgetitem.setFont(font);
-        __qtablewidgetitem.setBackground(QColor(199, 199, 199));
-        self.Table.setHorizontalHeaderItem(0, __qtablewidgetitem)
-        __qtablewidgetitem1 = QTableWidgetItem()
-        __qtablewidgetitem1.setFont(font);
-        __qtablewidgetitem1.setBackground(QColor(199, 199, 199));
-        self.Table.setHorizontalHeaderItem(1, __qtablewidgetitem1)
-        __qtablewidgetitem2 = QTableWidgetItem()
-        __qtablewidgetitem2.setFont(font);
-        self.Table.setHorizontalHeaderItem(2, __qtablewidgetitem2)
-        __qtablewidgetitem3 = QTableWidgetItem()
-        __qtablewidgetitem3.setFont(font);
-        __qtablewidgetitem3.setBackground(QColor(199, 199, 199));
-        self.Table.setHorizontalHeaderItem(3, __qtablewidgetitem3)
-        __qtablewidgetitem4 = QTableWidgetItem()
-        __qtablewidgetitem4.setFont(font);
-        self.Table.setHorizontalHeaderItem(4, __qtablewidgetitem4)
-        __qtablewidgetitem5 = QTableWidgetItem()
-        __qtablewidgetitem5.setFont(font);
-        self.Table.setHorizontalHeaderItem(5, __qtablewidgetitem5)
+        self.Table = QTableView(self.files_frame)
         self.Table.setObjectName(u"Table")
         self.Table.setGeometry(QRect(320, 50, 1351, 701))
         self.Table.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
@@ -229,18 +206,6 @@ class Ui_MainWindow(object):
         self.label_7.setText(QCoreApplication.translate("MainWindow", u"\u0412\u044b\u0431\u0440\u0430\u043d\u043d\u0430\u044f \u0434\u0438\u0440\u0435\u043a\u0442\u043e\u0440\u0438\u044f:", None))
         self.instruction_Button.setText(QCoreApplication.translate("MainWindow", u"\u0418\u043d\u0441\u0442\u0440\u0443\u043a\u0446\u0438\u044f", None))
         self.label_8.setText(QCoreApplication.translate("MainWindow", u"\u041f\u0435\u0440\u0435\u0447\u0435\u043d\u044c \u0444\u0430\u0439\u043b\u043e\u0432 \u043f\u0430\u043a\u0435\u0442\u0430 \u0441\u043c\u0435\u0442\u043d\u043e\u0439 \u0434\u043e\u043a\u0443\u043c\u0435\u043d\u0442\u0430\u0446\u0438\u0438:", None))
-        ___qtablewidgetitem = self.Table.horizontalHeaderItem(0)
-        ___qtablewidgetitem.setText(QCoreApplication.translate("MainWindow", u"\u0418\u043c\u044f (\u0434\u0432\u043e\u0439\u043d\u043e\u0435 \u043d\u0430\u0436\u0430\u0442\u0438\u0435 - \u043e\u0442\u043a\u0440\u044b\u0442\u044c)", None));
-        ___qtablewidgetitem1 = self.Table.horizontalHeaderItem(1)
-        ___qtablewidgetitem1.setText(QCoreApplication.translate("MainWindow", u"\u041f\u0440\u0435\u0434\u043f\u043e\u043b\u0430\u0433\u0430\u0435\u043c\u044b\u0439 \u0442\u0438\u043f", None));
-        ___qtablewidgetitem2 = self.Table.horizontalHeaderItem(2)
-        ___qtablewidgetitem2.setText(QCoreApplication.translate("MainWindow", u"\u041c\u0430\u0441\u043a\u0430", None));
-        ___qtablewidgetitem3 = self.Table.horizontalHeaderItem(3)
-        ___qtablewidgetitem3.setText(QCoreApplication.translate("MainWindow", u"\u041d\u043e\u0432\u043e\u0435 \u0438\u043c\u044f", None));
-        ___qtablewidgetitem4 = self.Table.horizontalHeaderItem(4)
-        ___qtablewidgetitem4.setText(QCoreApplication.translate("MainWindow", u"\u041f\u0435\u0440\u0435\u0438\u043c\u0435\u043d\u043e\u0432\u0430\u0442\u044c?", None));
-        ___qtablewidgetitem5 = self.Table.horizontalHeaderItem(5)
-        ___qtablewidgetitem5.setText(QCoreApplication.translate("MainWindow", u"\u041d\u043e\u043c\u0435\u0440 \u0441\u043c\u0435\u0442\u044b", None));
 
         __sortingEnabled = self.FilesList.isSortingEnabled()
         self.FilesList.setSortingEnabled(False)